@@ -1,4 +1,5 @@
-import asyncio
+import os
+import sys
 from pathlib import Path
 import streamlit as st
 from dotenv import load_dotenv, find_dotenv
@@ -7,25 +8,52 @@ from langchain import hub
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_openai import ChatOpenAI
 
-from tools.email import send_email
-from tools.producthunt import get_all_product_hunt_posts, read_more_product_hunt
-from tools.hackernews import get_all_hackernews_posts, read_more_hackernews
+# The helpers shared between the examples are in `shared/` at the root of the repo
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tools.email import get_email_status, outbox, send_email  # noqa: E402
+from tools.producthunt import (  # noqa: E402
+    get_all_product_hunt_posts,
+    get_new_product_hunt_posts,
+    read_more_product_hunt,
+)
+from tools.hackernews import (  # noqa: E402
+    get_all_hackernews_posts,
+    get_new_hackernews_posts,
+    read_more_hackernews,
+)
+from tools.session import sessions  # noqa: E402
+from tools.watcher import watcher  # noqa: E402
+from shared.loop_runner import BackgroundLoop  # noqa: E402
+from shared.selector_cache import get_selector_cache  # noqa: E402
 
 
 current_file_path = Path(__file__).resolve()
 env_path = current_file_path.parent / ".env"
 load_dotenv(env_path, override=True)
 
+# Seconds before an LLM request is abandoned and retried, override with LLM_TIMEOUT
+LLM_TIMEOUT = 60
+LLM_MAX_RETRIES = 2
+
 tools = [
     get_all_product_hunt_posts,
     get_all_hackernews_posts,
+    get_new_product_hunt_posts,
+    get_new_hackernews_posts,
     read_more_hackernews,
     read_more_product_hunt,
     send_email,
+    get_email_status,
 ]
 
 prompt = hub.pull("hwchase17/openai-tools-agent")
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+llm = ChatOpenAI(
+    model="gpt-4o",
+    temperature=0,
+    timeout=float(os.getenv("LLM_TIMEOUT", LLM_TIMEOUT)),
+    max_retries=LLM_MAX_RETRIES,
+)
 agent = create_openai_tools_agent(llm, tools, prompt)  # type: ignore
 agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)  # type: ignore
 
@@ -39,6 +67,27 @@ async def process_user_input(user_input, chat_history):
     return response["output"]
 
 
+# One event loop per Streamlit server, so the browser sessions shared by the tools
+# survive between chat turns. The browsers are closed when the server stops.
+@st.cache_resource
+def get_event_loop() -> BackgroundLoop:
+    runner = BackgroundLoop()
+    # The outbox lets go of its Outlook tab before the browsers are closed
+    runner.on_shutdown(outbox.close)
+    runner.on_shutdown(watcher.close)
+    runner.on_shutdown(sessions.shutdown)
+    # Emails still queued from an earlier run go out again
+    runner.submit(outbox.start())
+    # Watch mode keeps the Hacker News and Product Hunt snapshots fresh in the
+    # background, so asking for new posts doesn't have to wait for an extraction
+    if os.getenv("WATCH_INTERVAL"):
+        watcher.interval = float(os.environ["WATCH_INTERVAL"])
+        runner.submit(watcher.start())
+    # Selectors the tools click and type with are served from memory from the start
+    get_selector_cache().warmup(["outlook.live.com", "www.producthunt.com"])
+    return runner
+
+
 # Streamlit UI
 def main():
     st.title("Competition Watch AI Agent")
@@ -65,7 +114,7 @@ def main():
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
             message_placeholder.markdown("Thinking...")
-            full_response = asyncio.run(
+            full_response = get_event_loop().run(
                 process_user_input(prompt, st.session_state.messages)
             )
             message_placeholder.markdown(full_response)
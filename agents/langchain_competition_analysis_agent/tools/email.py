@@ -1,14 +1,29 @@
-from dendrite import AsyncDendrite
+from pathlib import Path
+
 from langchain_core.tools import tool
 
+from shared.outbox import OUTLOOK_AUTH, Outbox
+from tools.session import sessions
+
+OUTBOX_FILE = Path("cache") / "outbox.sqlite3"
+# Seconds a tool call waits for its email to go out before reporting it as queued
+SEND_WAIT_TIMEOUT = 120
+
+# Emails are sent one at a time from the shared, logged in Outlook session
+outbox = Outbox(OUTBOX_FILE, get_client=lambda: sessions.get_client(OUTLOOK_AUTH))
+
 
 @tool
 async def send_email(email_address: str, subject: str, body: str):
     """This tool sends an email to the provided email address with the provided subject and body. Don't use markdown in the body."""
-    async with AsyncDendrite(auth="outlook.live.com") as client:
-        await client.goto("https://outlook.live.com/mail/0/")
-        await client.click("the new email button")
-        await client.fill_fields(
-            {"to_field": email_address, "subject_field": subject, "body_field": body}
-        )
-        await client.click("the send email button")
+    email = await outbox.send(email_address, subject, body, timeout=SEND_WAIT_TIMEOUT)
+    return email.describe()
+
+
+@tool
+async def get_email_status() -> str:
+    """Lists the recently sent emails and whether they were sent, are still queued or failed."""
+    emails = outbox.recent()
+    if not emails:
+        return "No emails have been sent yet"
+    return "\n".join(email.describe() for email in emails)
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+CACHE_FILE = Path("cache") / "extractions.sqlite3"
+# Entries are dropped after a day, and checked against the live page when they're
+# more than 15 minutes old, or extracted again if they can't be revalidated
+CACHE_TTL = 24 * 3600
+REVALIDATE_AFTER = 15 * 60
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Pages on these hosts show live points, comments and ages, so their content hash
+# never matches from one load to the next and they're never revalidated
+VOLATILE_HOSTS = {"news.ycombinator.com", "www.producthunt.com", "producthunt.com"}
+
+# Query parameters that never change what a page shows
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|ref|fbclid|gclid)$")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of `url`, so trivially different links share a cache entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (k, v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not TRACKING_PARAMS.match(k)
+        )
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def content_hash(html: str) -> str:
+    # Scripts, styles and whitespace change between loads without the content changing
+    text = re.sub(r"<(script|style)\b.*?</\1>", "", html, flags=re.S | re.I)
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+
+@dataclass
+class Validators:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+
+async def fetch_validators(url: str) -> Validators:
+    """The page's ETag, Last-Modified and content hash, with a plain HTTP GET."""
+    async with httpx.AsyncClient(follow_redirects=True, timeout=10) as http:
+        response = await http.get(url)
+        response.raise_for_status()
+    return Validators(
+        response.headers.get("etag"),
+        response.headers.get("last-modified"),
+        content_hash(response.text),
+    )
+
+
+async def is_unchanged(url: str, cached: Validators) -> bool:
+    """
+    Checks whether the page still matches the cached validators, as cheaply as the
+    server allows: a conditional HEAD if it sent an ETag or Last-Modified, otherwise
+    a GET of the raw HTML to compare content hashes. Much cheaper than a browser
+    load plus an extraction either way. Any failure counts as changed.
+    """
+    try:
+        if cached.etag or cached.last_modified:
+            headers = {}
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+            async with httpx.AsyncClient(follow_redirects=True, timeout=10) as http:
+                response = await http.head(url, headers=headers)
+            if response.status_code == 304:
+                return True
+            # Servers that ignore conditional requests still send the current values
+            return (
+                response.is_success
+                and response.headers.get("etag") == cached.etag
+                and response.headers.get("last-modified") == cached.last_modified
+            )
+        if cached.content_hash:
+            return (await fetch_validators(url)).content_hash == cached.content_hash
+    except httpx.HTTPError as e:
+        print(f"Could not revalidate {url}, extracting again: {e}")
+    return False
+
+
+class ExtractionCache:
+    """
+    Maps a normalized URL and extraction prompt to the extracted content, stored in
+    a local SQLite file with a TTL and least-recently-used eviction by size.
+    """
+
+    def __init__(self, path: Path, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            "key TEXT PRIMARY KEY, url TEXT NOT NULL, content TEXT NOT NULL, "
+            "size INTEGER NOT NULL, etag TEXT, last_modified TEXT, content_hash TEXT, "
+            "created_at REAL NOT NULL, validated_at REAL NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS extractions_last_used "
+            "ON extractions (last_used)"
+        )
+
+    @staticmethod
+    def key(url: str, prompt: str) -> str:
+        encoded = json.dumps([normalize_url(url), prompt])
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple[Any, float, Validators]]:
+        """The cached content, when it was last validated and its validators."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, etag, last_modified, content_hash, created_at, "
+                "validated_at FROM extractions WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            content, etag, last_modified, hash_, created_at, validated_at = row
+            if now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE extractions SET last_used = ? WHERE key = ?", (now, key)
+            )
+        return (
+            json.loads(content),
+            validated_at,
+            Validators(etag, last_modified, hash_),
+        )
+
+    def put(self, key: str, url: str, content: Any, validators: Validators):
+        now = time.time()
+        encoded = json.dumps(content, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, url, content, size, etag, "
+                "last_modified, content_hash, created_at, validated_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    encoded,
+                    len(encoded.encode()),
+                    validators.etag,
+                    validators.last_modified,
+                    validators.content_hash,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+            self._evict(now)
+
+    def mark_validated(self, key: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE extractions SET validated_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+
+    def _evict(self, now: float):
+        self._conn.execute(
+            "DELETE FROM extractions WHERE created_at < ?", (now - self.ttl,)
+        )
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM extractions"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used extractions until we're back under the limit
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM extractions ORDER BY last_used ASC"
+        ):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM extractions WHERE key = ?", stale_keys)
+
+
+@lru_cache(maxsize=None)
+def get_extraction_cache() -> ExtractionCache:
+    return ExtractionCache(CACHE_FILE, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES)
+
+
+async def cached_extract(
+    url: str, prompt: str, extract: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Returns what `extract()` returns for `url` and `prompt`, from the cache when
+    possible. Recent entries are returned as is, older ones after a cheap check that
+    the page hasn't changed. Only a miss or a changed page runs `extract()`.
+
+    Pages on VOLATILE_HOSTS, i.e. Hacker News and Product Hunt themselves, are
+    cached by TTL only: returned as is for REVALIDATE_AFTER seconds, then extracted
+    again without any HTTP requests for validators. Other pages, like the articles
+    Hacker News links to, are revalidated by ETag, Last-Modified or content hash.
+    """
+    cache = get_extraction_cache()
+    key = ExtractionCache.key(url, prompt)
+    revalidate = (urlsplit(url).hostname or "").lower() not in VOLATILE_HOSTS
+
+    cached = cache.get(key)
+    if cached is not None:
+        content, validated_at, validators = cached
+        if time.time() - validated_at < REVALIDATE_AFTER:
+            return content
+        if revalidate and await is_unchanged(url, validators):
+            cache.mark_validated(key)
+            return content
+
+    if not revalidate:
+        content = await extract()
+        cache.put(key, url, content, Validators())
+        return content
+
+    # Fetch the validators for next time while the browser extracts
+    content, validators = await asyncio.gather(
+        extract(), fetch_validators(url), return_exceptions=True
+    )
+    if isinstance(content, BaseException):
+        raise content
+    if isinstance(validators, BaseException):
+        print(f"Could not fetch validators for {url}: {validators}")
+        validators = Validators()
+    cache.put(key, url, content, validators)
+    return content
@@ -1,25 +1,57 @@
 from langchain_core.tools import tool
-from dendrite import AsyncDendrite
+
+from shared.readiness import network_idle, selector_count_stable, wait_until_ready
+from tools.extraction_cache import cached_extract
+from tools.session import sessions
+from tools.watcher import FrontPage, Post, describe_post, watcher
+
+HACKERNEWS = "hackernews"
+
+
+async def extract_front_page() -> list[Post]:
+    async with sessions.tab("https://news.ycombinator.com/") as tab:
+        # The front page is server rendered, it's loaded once the post rows are there
+        await wait_until_ready(tab, network_idle(), selector_count_stable("tr.athing"))
+        page = await tab.extract(
+            "Get all top posts from Hacker News in order with their rank, title, url, points and number of comments",
+            type_spec=FrontPage,
+        )
+        # A failed extraction raises rather than being recorded as an empty page,
+        # which would look like every post disappeared
+        if page is None:
+            raise RuntimeError("Could not extract the Hacker News front page")
+        return page.posts
+
+
+watcher.add_source(HACKERNEWS, extract_front_page)
 
 
 @tool
 async def get_all_hackernews_posts() -> str:
     """Get's all the top posts from Hacker News from today"""
-    async with AsyncDendrite() as client:
-        await client.goto("https://news.ycombinator.com/")
-        await client.wait_for("The front page is loaded")
-        posts = await client.extract(
-            "Get all top posts from Hacker News as a string containing title, url, points, and number of comments"
-        )
-        return posts
+    posts = await watcher.snapshot(HACKERNEWS)
+    return "\n".join(describe_post(post) for post in posts)
+
+
+@tool
+async def get_new_hackernews_posts() -> str:
+    """Gets only the Hacker News posts that are new, or have moved or gained points or comments, since you last looked at Hacker News. Use this instead of get_all_hackernews_posts when you've seen the posts before."""
+    changes = await watcher.changes(HACKERNEWS)
+    if not changes:
+        return "Nothing has changed on Hacker News since you last looked"
+    return "\n".join(change.describe() for change in changes)
 
 
 @tool
 async def read_more_hackernews(url: str) -> str:
     """If you want to learn more about a Hacker News post, this call this function to go to it's url and summerize the contents."""
-    async with AsyncDendrite() as client:
-        await client.goto(url)
-        info = await client.extract(
-            "Get the informational text of the article/post/website, return as a string"
-        )
-        return info
+    prompt = (
+        "Get the informational text of the article/post/website, return as a string"
+    )
+
+    async def extract():
+        async with sessions.tab(url) as tab:
+            return await tab.extract(prompt)
+
+    # Repeat reads of the same post come from the cache
+    return await cached_extract(url, prompt, extract)
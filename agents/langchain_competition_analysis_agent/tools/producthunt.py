@@ -1,27 +1,57 @@
-import asyncio
 from langchain_core.tools import tool
-from dendrite import AsyncDendrite
+
+from shared.readiness import dom_quiet, network_idle, wait_until_ready
+from shared.selector_cache import click
+from tools.extraction_cache import cached_extract
+from tools.session import sessions
+from tools.watcher import FrontPage, Post, describe_post, watcher
+
+PRODUCTHUNT = "producthunt"
+
+
+async def extract_todays_posts() -> list[Post]:
+    async with sessions.tab("https://www.producthunt.com/") as tab:
+        await click(tab, "the see all of today's posts button")
+        # Wait for the full list to load instead of a fixed sleep
+        await wait_until_ready(tab, network_idle(), dom_quiet())
+        page = await tab.extract(
+            "Get all today's posts from product hunt in order with their rank, name as the title, url, upvotes as the points, number of comments and desc and categories as the description",
+            type_spec=FrontPage,
+        )
+        # A failed extraction raises rather than being recorded as an empty page,
+        # which would look like every post disappeared
+        if page is None:
+            raise RuntimeError("Could not extract today's Product Hunt posts")
+        return page.posts
+
+
+watcher.add_source(PRODUCTHUNT, extract_todays_posts)
 
 
 @tool
 async def get_all_product_hunt_posts() -> str:
     """Get's all the posts from product hunt from today"""
-    async with AsyncDendrite() as client:
-        await client.goto(f"https://www.producthunt.com/")
-        await client.click("the see all of today's posts button")
-        await asyncio.sleep(5)
-        posts = await client.extract(
-            "Get all today's posts from product hunt as a string containing name, desc, categories, upvotes and url"
-        )
-        return posts
+    posts = await watcher.snapshot(PRODUCTHUNT)
+    return "\n".join(describe_post(post) for post in posts)
+
+
+@tool
+async def get_new_product_hunt_posts() -> str:
+    """Gets only today's product hunt posts that are new, or have moved or gained upvotes or comments, since you last looked at product hunt. Use this instead of get_all_product_hunt_posts when you've seen the posts before."""
+    changes = await watcher.changes(PRODUCTHUNT)
+    if not changes:
+        return "Nothing has changed on product hunt since you last looked"
+    return "\n".join(change.describe() for change in changes)
 
 
 @tool
 async def read_more_product_hunt(url: str) -> str:
     """If you want to learn more about a producthunt product, call this function. Use this tool to research a product closer."""
-    async with AsyncDendrite() as client:
-        await client.goto(url)
-        info = await client.extract(
-            "Get all the description text about this product and the discussion and return as a string"
-        )
-        return info
+    prompt = "Get all the description text about this product and the discussion and return as a string"
+
+    async def extract():
+        async with sessions.tab(url) as tab:
+            return await tab.extract(prompt)
+
+    # Repeat reads of the same product come from the cache
+    return await cached_extract(url, prompt, extract)
@@ -0,0 +1,94 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from dendrite import AsyncDendrite, AsyncPage
+
+
+class BrowserSessionManager:
+    """
+    Shares long-lived Dendrite browsers between tool calls and agent turns.
+
+    There is one browser per `auth` domain (anonymous tools use `auth=None`), so
+    authenticated and anonymous tools never share cookies. Each tool call gets its
+    own tab in the matching browser. Browsers are launched lazily, replaced when
+    they stop responding and closed by `shutdown()`.
+    """
+
+    def __init__(self):
+        self._clients: dict[Optional[str], AsyncDendrite] = {}
+        self._locks: dict[Optional[str], asyncio.Lock] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _check_loop(self):
+        # Playwright objects are bound to the event loop that created them. If that
+        # loop is gone (e.g. one `asyncio.run` per turn) the old browsers can't be
+        # used or awaited anymore, so forget them and start over on this loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._clients:
+                print(
+                    "Event loop changed, discarding browser sessions from the old loop"
+                )
+            self._clients = {}
+            self._locks = {}
+            self._loop = loop
+
+    async def _is_healthy(self, client: AsyncDendrite) -> bool:
+        if client.closed:
+            return False
+        if client.browser_context is None:
+            # Not launched yet, it will be launched on first use
+            return True
+        try:
+            await asyncio.wait_for(client.browser_context.cookies(), timeout=5)
+            return True
+        except Exception as e:
+            print(f"Browser session is unhealthy, relaunching: {e}")
+            return False
+
+    async def get_client(self, auth: Optional[str] = None) -> AsyncDendrite:
+        """Returns the shared browser for `auth`, launching or replacing it if needed."""
+        self._check_loop()
+        lock = self._locks.setdefault(auth, asyncio.Lock())
+        async with lock:
+            client = self._clients.get(auth)
+            if client is not None and await self._is_healthy(client):
+                return client
+            if client is not None:
+                await self._close_client(client)
+
+            client = AsyncDendrite(auth=auth) if auth else AsyncDendrite()
+            self._clients[auth] = client
+            return client
+
+    @asynccontextmanager
+    async def tab(
+        self, url: str, auth: Optional[str] = None
+    ) -> AsyncIterator[AsyncPage]:
+        """Opens `url` in a new tab of the shared browser and closes the tab afterwards."""
+        client = await self.get_client(auth)
+        tab = await client.new_tab(url)
+        try:
+            yield tab
+        finally:
+            try:
+                await tab.close()
+            except Exception as e:
+                print(f"Failed to close tab: {e}")
+
+    @staticmethod
+    async def _close_client(client: AsyncDendrite):
+        try:
+            await client.close()
+        except Exception as e:
+            print(f"Failed to close browser session: {e}")
+
+    async def shutdown(self):
+        """Closes every browser. Authenticated sessions upload their state on close."""
+        clients, self._clients = self._clients, {}
+        await asyncio.gather(*[self._close_client(c) for c in clients.values()])
+
+
+# Shared by every tool in this package
+sessions = BrowserSessionManager()
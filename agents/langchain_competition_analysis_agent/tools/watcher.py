@@ -0,0 +1,259 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from tools.extraction_cache import normalize_url
+
+SNAPSHOT_FILE = Path("cache") / "snapshots.sqlite3"
+# A snapshot this many seconds old is used as is instead of extracting the page again
+SNAPSHOT_MAX_AGE = 5 * 60
+# Seconds between two polls of each site in watch mode
+POLL_INTERVAL = 15 * 60
+# Posts that haven't been on the page for this long are forgotten
+FORGET_AFTER = 7 * 24 * 3600
+
+NEW = "new"
+CHANGED = "changed"
+# How much a post has to move before it's reported again, small changes in points
+# or comments happen on every poll and aren't worth the agent's attention
+CHANGE_THRESHOLDS = {"rank": 5, "points": 20, "comments": 10}
+
+
+class Post(BaseModel):
+    rank: int
+    title: str
+    url: str
+    # Missing on some posts, Hacker News job posts have neither and Product Hunt
+    # doesn't always show a comment count
+    points: Optional[int] = None
+    comments: Optional[int] = None
+    description: Optional[str] = None
+
+
+class FrontPage(BaseModel):
+    posts: list[Post]
+
+
+def post_key(post: Post) -> str:
+    # The same post under a slightly different link is still the same post
+    return normalize_url(post.url) if post.url else post.title.strip().lower()
+
+
+def describe_post(post: Post) -> str:
+    text = f"#{post.rank} {post.title} ({post.url})"
+    if post.points is not None:
+        text += f", {post.points} points"
+    if post.comments is not None:
+        text += f", {post.comments} comments"
+    return f"{text}: {post.description}" if post.description else text
+
+
+@dataclass
+class PostChange:
+    kind: str
+    post: Post
+    # The values last reported for the tracked fields that changed
+    previous: dict[str, Optional[int]]
+
+    def describe(self) -> str:
+        if self.kind == NEW:
+            return f"New: {describe_post(self.post)}"
+        changes = ", ".join(
+            f"{field} {old or 0} -> {getattr(self.post, field) or 0}"
+            for field, old in self.previous.items()
+        )
+        return f"Changed ({changes}): {describe_post(self.post)}"
+
+
+def _tracked(post: Post) -> dict[str, Optional[int]]:
+    return {field: getattr(post, field) for field in CHANGE_THRESHOLDS}
+
+
+def _moved(old: Optional[int], new: Optional[int], threshold: int) -> bool:
+    # A count that's missing from the page counts as 0
+    return abs((new or 0) - (old or 0)) >= threshold
+
+
+class SnapshotStore:
+    """
+    The latest snapshot of each watched page in a local SQLite file, one row per
+    post, next to the values last reported to the agent.
+
+    Changes are always measured against what was last reported rather than the
+    previous poll, so a post that creeps up a few points per poll is reported
+    once it has moved enough in total.
+    """
+
+    def __init__(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: each statement is its own atomic transaction
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posts ("
+            "source TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL, "
+            "reported TEXT, first_seen REAL NOT NULL, last_seen REAL NOT NULL, "
+            "PRIMARY KEY (source, key))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS polls ("
+            "source TEXT PRIMARY KEY, polled_at REAL NOT NULL)"
+        )
+
+    def polled_at(self, source: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT polled_at FROM polls WHERE source = ?", (source,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record(self, source: str, posts: list[Post]):
+        """Stores `posts` as the current snapshot of `source`."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO posts (source, key, data, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (source, key) "
+                "DO UPDATE SET data = excluded.data, last_seen = excluded.last_seen",
+                [
+                    (source, post_key(post), post.model_dump_json(), now, now)
+                    for post in posts
+                ],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO polls (source, polled_at) VALUES (?, ?)",
+                (source, now),
+            )
+            self._conn.execute(
+                "DELETE FROM posts WHERE source = ? AND last_seen < ?",
+                (source, now - FORGET_AFTER),
+            )
+            self._conn.execute("COMMIT")
+
+    def _current(self, source: str) -> list[tuple[str, Post, Optional[dict]]]:
+        rows = self._conn.execute(
+            "SELECT posts.key, posts.data, posts.reported FROM posts "
+            "JOIN polls ON polls.source = posts.source "
+            "WHERE posts.source = ? AND posts.last_seen = polls.polled_at",
+            (source,),
+        ).fetchall()
+        current = [
+            (key, Post.model_validate_json(data), json.loads(reported or "null"))
+            for key, data, reported in rows
+        ]
+        return sorted(current, key=lambda row: row[1].rank)
+
+    def _mark_reported(self, source: str, posts: list[tuple[str, Post]]):
+        self._conn.executemany(
+            "UPDATE posts SET reported = ? WHERE source = ? AND key = ?",
+            [(json.dumps(_tracked(post)), source, key) for key, post in posts],
+        )
+
+    def snapshot(self, source: str) -> list[Post]:
+        """Every post on the page as of the last poll, all of which count as reported."""
+        with self._lock:
+            current = self._current(source)
+            self._mark_reported(source, [(key, post) for key, post, _ in current])
+        return [post for _, post, _ in current]
+
+    def take_changes(self, source: str) -> list[PostChange]:
+        """Posts that are new or have changed enough since they were last reported."""
+        changes = []
+        with self._lock:
+            current = self._current(source)
+            for key, post, reported in current:
+                if reported is None:
+                    changes.append((key, PostChange(NEW, post, {})))
+                    continue
+                previous = {
+                    field: old
+                    for field, old in reported.items()
+                    if _moved(old, getattr(post, field), CHANGE_THRESHOLDS[field])
+                }
+                if previous:
+                    changes.append((key, PostChange(CHANGED, post, previous)))
+            self._mark_reported(source, [(key, change.post) for key, change in changes])
+        return [change for _, change in changes]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class Watcher:
+    """
+    Polls the registered pages, every `interval` seconds in watch mode or on
+    demand when the agent asks, and keeps their snapshots in `store`.
+    """
+
+    def __init__(self, store: SnapshotStore, interval: float = POLL_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._sources: dict[str, Callable[[], Awaitable[list[Post]]]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    def add_source(self, source: str, extract: Callable[[], Awaitable[list[Post]]]):
+        self._sources[source] = extract
+
+    async def refresh(self, source: str, max_age: Optional[float] = None):
+        """Polls `source` unless its snapshot is less than `max_age` seconds old."""
+        if max_age is None:
+            # In watch mode the snapshots are kept fresh in the background already
+            watching = self._worker is not None and not self._worker.done()
+            max_age = (
+                max(self.interval, SNAPSHOT_MAX_AGE) if watching else SNAPSHOT_MAX_AGE
+            )
+        async with self._locks.setdefault(source, asyncio.Lock()):
+            # A poll that was running while we waited counts as fresh
+            polled_at = self.store.polled_at(source)
+            if polled_at is not None and time.time() - polled_at < max_age:
+                return
+            posts = await self._sources[source]()
+            self.store.record(source, posts)
+            print(f"Polled {source}, {len(posts)} posts")
+
+    async def snapshot(self, source: str) -> list[Post]:
+        await self.refresh(source)
+        return self.store.snapshot(source)
+
+    async def changes(self, source: str) -> list[PostChange]:
+        await self.refresh(source)
+        return self.store.take_changes(source)
+
+    async def run(self):
+        """Watch mode, keeps every source's snapshot at most `interval` seconds old."""
+        while True:
+            for source in self._sources:
+                try:
+                    await self.refresh(source, max_age=self.interval)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Failed to poll {source}, trying again next time: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        self.store.close()
+
+
+# Shared by the Hacker News and Product Hunt tools, which register their pages
+watcher = Watcher(SnapshotStore(SNAPSHOT_FILE))
@@ -0,0 +1,180 @@
+# Shared async OpenAI client layer for the single-file agents in this folder:
+# - One long-lived client per event loop, so HTTP keep-alive connections are reused
+#   between calls and awaiting a completion never blocks browser work on the loop
+# - A timeout and retries on every request, and cancelling the awaiting task
+#   cancels the request
+# - An opt-in on-disk response cache keyed by model, messages and parameters, with
+#   a TTL and least-recently-used eviction once it grows past a size limit
+#
+# Enable the cache by passing `cache=True` or by setting LLM_CACHE=1 in your .env.
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+DEFAULT_MODEL = "gpt-4o"
+# Seconds before a request is abandoned and retried, override with LLM_TIMEOUT
+LLM_TIMEOUT = 60
+LLM_MAX_RETRIES = 2
+# Defaults, can be overridden with LLM_CACHE_FILE, LLM_CACHE_TTL and LLM_CACHE_MAX_BYTES
+CACHE_FILE = "cache/llm_responses.sqlite3"
+CACHE_TTL = 7 * 24 * 3600
+CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+
+# The async client's connection pool belongs to the event loop it was first used on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_openai() -> AsyncOpenAI:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncOpenAI(
+            timeout=float(os.getenv("LLM_TIMEOUT", LLM_TIMEOUT)),
+            max_retries=LLM_MAX_RETRIES,
+        )
+    return client
+
+
+async def acreate_completion(
+    messages: list, model: str = DEFAULT_MODEL, **params
+) -> ChatCompletion:
+    """The full completion, for agents that need tool or function calls."""
+    return await get_async_openai().chat.completions.create(
+        messages=messages, model=model, **params
+    )
+
+
+class ResponseCache:
+    """Maps a request key to the completion text, stored in a local SQLite file."""
+
+    def __init__(self, path: Path, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+
+    @staticmethod
+    def key(model: str, messages: list, params: dict) -> str:
+        request = {"model": model, "messages": messages, "params": params}
+        encoded = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, created_at = row
+            if now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+        return content
+
+    def put(self, key: str, content: str):
+        now = time.time()
+        size = len(content.encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, content, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+        )
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used responses until we're back under the limit
+        excess = total - self.max_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_used ASC"
+        ):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> ResponseCache:
+    # Read lazily so the settings can come from a .env file loaded after import
+    return ResponseCache(
+        Path(os.getenv("LLM_CACHE_FILE", CACHE_FILE)),
+        ttl=float(os.getenv("LLM_CACHE_TTL", CACHE_TTL)),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", CACHE_MAX_BYTES)),
+    )
+
+
+def _use_cache(cache: Optional[bool]) -> bool:
+    if cache is not None:
+        return cache
+    return os.getenv("LLM_CACHE", "").lower() in ("1", "true", "yes")
+
+
+async def achat_completion(
+    messages: list,
+    model: str = DEFAULT_MODEL,
+    cache: Optional[bool] = None,
+    timeout: Optional[float] = None,
+    **params,
+) -> str:
+    """
+    Returns the completion text, served from the response cache when enabled.
+    `timeout` overrides the client's timeout for this request.
+    """
+    response_cache = get_response_cache() if _use_cache(cache) else None
+    key = ResponseCache.key(model, messages, params)
+    if response_cache and (cached := response_cache.get(key)) is not None:
+        return cached
+
+    if timeout is not None:
+        params = {**params, "timeout": timeout}
+    oai_res = await acreate_completion(messages, model, **params)
+    content = oai_res.choices[0].message.content
+    if not content:
+        raise Exception("Failed to get successful response from Open AI.")
+    if response_cache:
+        response_cache.put(key, content)
+    return content
@@ -4,29 +4,61 @@
 # 3. Selects the best recipe based on preferences using OpenAI
 # 4. Extracts and translates the chosen recipe
 #
+# While the LLM picks a recipe, the first few listed recipes are already loaded and
+# extracted in background tabs, so the chosen one is usually ready when it answers.
+#
 # Uses OpenAI for the assistant and Dendrite for browsing the web,
 # enabling automated recipe finding and selection based on user preferences.
 
 
 import asyncio
-from openai import OpenAI
+import json
+from urllib.parse import urljoin
 from openai.types.chat import ChatCompletionUserMessageParam
 
 from dendrite import AsyncDendrite
 
+from llm_client import achat_completion, acreate_completion
+
+RECIPES_URL = "https://www.ica.se/recept/"
+RECIPE_PROMPT = "Please output a nice, readable string containing the page's recipe that contains a header for ingredients and one for the steps in English."
+# How many of the listed recipes are prefetched while the LLM picks one
+PREFETCH_RECIPES = 3
+
 
-def ai_request(prompt: str):
-    openai = OpenAI()
+# Awaiting the LLM doesn't block the event loop, so other users' browser work keeps going
+async def ai_request(prompt: str):
     messages = [ChatCompletionUserMessageParam(role="user", content=prompt)]
-    oai_res = openai.chat.completions.create(messages=messages, model="gpt-4o")
-    if oai_res.choices[0].message.content:
-        return oai_res.choices[0].message.content
-    raise Exception("Failed to get successful response from Open AI.")
+    return await achat_completion(messages, model="gpt-4o")
+
+
+def recipe_key(url: str) -> str:
+    # The LLM may answer with a relative URL, extra whitespace or a trailing slash
+    return urljoin(RECIPES_URL, url.strip().strip("<>\"'")).rstrip("/")
+
 
+def candidate_urls(recipes_res) -> list[str]:
+    if not isinstance(recipes_res, list):
+        return []
+    return [
+        urljoin(RECIPES_URL, r["url_to_recipe"])
+        for r in recipes_res
+        if isinstance(r, dict) and r.get("url_to_recipe")
+    ]
 
-async def find_recipe(recipe: str, preferences: str):
+
+async def extract_recipe(client: AsyncDendrite, url: str) -> str:
+    # Each recipe gets its own tab, so prefetches never navigate each other's pages
+    tab = await client.new_tab(url)
+    try:
+        return await tab.extract(RECIPE_PROMPT, str)
+    finally:
+        await tab.close()
+
+
+async def find_recipe(recipe: str, preferences: str, prefetch: int = PREFETCH_RECIPES):
     client = AsyncDendrite()
-    await client.goto("https://www.ica.se/recept/")
+    await client.goto(RECIPES_URL)
 
     close_cookies_button = await client.get_element("The reject cookies button")
     if close_cookies_button:
@@ -50,20 +82,29 @@ async def find_recipe(recipe: str, preferences: str):
     
     Important: You output should consist of only one valid URL, nothing else, pick the one that best suits my preferences."""
 
-    url = ai_request(find_recipe_prompt)
-    await client.goto(url)
-    recipe = await client.extract(
-        "Please output a nice, readable string containing the page's recipe that contains a header for ingredients and one for the steps in English.",
-        str,
-    )
-
-    return recipe
+    # Speculatively load the top candidates while the LLM decides
+    prefetches = {
+        recipe_key(url): asyncio.create_task(extract_recipe(client, url))
+        for url in candidate_urls(recipes_res)[:prefetch]
+    }
+    try:
+        url = await ai_request(find_recipe_prompt)
+
+        chosen = prefetches.pop(recipe_key(url), None)
+        if chosen is not None:
+            try:
+                return await chosen
+            except Exception as e:
+                print(f"Prefetching {url} failed, loading it again: {e}")
+        return await extract_recipe(client, recipe_key(url))
+    finally:
+        # The recipes the LLM didn't pick aren't needed anymore
+        for task in prefetches.values():
+            task.cancel()
+        await asyncio.gather(*prefetches.values(), return_exceptions=True)
 
 
 class CookingAgent:
-    def __init__(self):
-        self.openai = OpenAI()
-
     async def chat(self, user_input: str):
         messages = [
             {
@@ -73,9 +114,9 @@ class CookingAgent:
             {"role": "user", "content": user_input},
         ]
 
-        response = self.openai.chat.completions.create(
+        response = await acreate_completion(
             model="gpt-4o",
-            messages=messages,  # type: ignore
+            messages=messages,
             functions=[
                 {
                     "name": "find_recipe",
@@ -103,7 +144,7 @@ class CookingAgent:
 
         if message.function_call:
             function_name = message.function_call.name
-            function_args = eval(message.function_call.arguments)
+            function_args = json.loads(message.function_call.arguments)
 
             if function_name == "find_recipe":
                 recipe = await find_recipe(
@@ -118,8 +159,10 @@ class CookingAgent:
 async def main():
     agent = CookingAgent()
     while True:
-        user_input = input(
-            "What would you like to make? E.g 'Vegetarian tacos that can be made in 30 mins'\n\nYou: "
+        # Read input in a thread so the event loop stays free while waiting
+        user_input = await asyncio.to_thread(
+            input,
+            "What would you like to make? E.g 'Vegetarian tacos that can be made in 30 mins'\n\nYou: ",
         )
         if user_input.lower() == "exit":
             break
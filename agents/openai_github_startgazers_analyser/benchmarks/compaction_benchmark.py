@@ -0,0 +1,100 @@
+# Measures how much the markdown compaction stage shrinks saved GitHub profiles.
+#
+#   python benchmarks/compaction_benchmark.py          # token reduction only
+#   python benchmarks/compaction_benchmark.py --llm    # also time gpt-4o on raw vs compacted
+#
+# Fixtures are profile pages saved with `await tab.markdown()`, drop more `.md` files
+# into benchmarks/fixtures to benchmark them too.
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compaction import compact_profile_markdown, estimate_tokens  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+PROMPT = (
+    "We are trying to find potential hires for a project and/or users to interview. "
+    "Summarize this GitHub user in three sentences and give them a score from 0 to 100, "
+    "here is some markdown from the page: {md}"
+)
+
+
+async def time_completion(client, md: str, repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await client.chat.completions.create(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": PROMPT.format(md=md)}],
+        )
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+async def main(use_llm: bool, repeats: int):
+    fixtures = sorted(FIXTURES_DIR.glob("*.md"))
+    if not fixtures:
+        print(f"No fixtures found in {FIXTURES_DIR}")
+        return
+
+    client = None
+    if use_llm:
+        from dotenv import load_dotenv
+        from openai import AsyncOpenAI
+
+        load_dotenv(FIXTURES_DIR.parent.parent / ".env")
+        client = AsyncOpenAI()
+
+    header = f"{'fixture':<24}{'raw tok':>10}{'compact tok':>13}{'saved':>8}{'compact ms':>12}"
+    if use_llm:
+        header += f"{'raw llm s':>11}{'compact llm s':>15}"
+    print(header)
+    print("-" * len(header))
+
+    total_raw = total_compact = 0
+    for path in fixtures:
+        md = path.read_text()
+
+        start = time.perf_counter()
+        compacted = compact_profile_markdown(md)
+        compact_ms = (time.perf_counter() - start) * 1000
+
+        raw_tokens, compact_tokens = estimate_tokens(md), estimate_tokens(compacted)
+        total_raw += raw_tokens
+        total_compact += compact_tokens
+        row = (
+            f"{path.stem:<24}{raw_tokens:>10}{compact_tokens:>13}"
+            f"{1 - compact_tokens / raw_tokens:>8.0%}{compact_ms:>12.2f}"
+        )
+        if client is not None:
+            raw_latency = await time_completion(client, md, repeats)
+            compact_latency = await time_completion(client, compacted, repeats)
+            row += f"{raw_latency:>11.2f}{compact_latency:>15.2f}"
+        print(row)
+
+    print("-" * len(header))
+    print(
+        f"{'total':<24}{total_raw:>10}{total_compact:>13}"
+        f"{1 - total_compact / total_raw:>8.0%}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark markdown compaction on saved profiles"
+    )
+    parser.add_argument(
+        "--llm", action="store_true", help="Also time gpt-4o on raw vs compacted"
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=3, help="LLM calls per fixture and variant"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.llm, args.repeats))
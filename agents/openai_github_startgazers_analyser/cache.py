@@ -0,0 +1,197 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+
+def url_key(url: str) -> int:
+    # 64-bit hash of a URL, as a signed integer so SQLite can store it as a rowid
+    digest = hashlib.blake2b(url.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class StargazerCache:
+    """
+    SQLite-backed cache of stargazer profiles with one row per profile.
+
+    Every write is a single-row upsert in its own transaction, so the cost of
+    saving a profile stays constant no matter how many profiles are cached, and
+    a crash mid-write can never leave a half-written cache behind. Expired rows
+    are compacted away by a background thread.
+
+    Next to the profiles there's a `seen` table of 64-bit URL hashes, so `contains`
+    can answer whether a profile is cached with one lookup in a compact index,
+    without reading or loading any profile data.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: Optional[float] = None,
+        compact_interval: float = 300.0,
+        legacy_json: Optional[Path] = None,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "url TEXT PRIMARY KEY, data TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS profiles_expires_at ON profiles (expires_at)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            "key INTEGER PRIMARY KEY, expires_at REAL)"
+        )
+        self._index_existing_profiles()
+        if legacy_json is not None:
+            self._import_legacy_json(Path(legacy_json))
+
+        self._stop = threading.Event()
+        self._compactor = threading.Thread(
+            target=self._compact_periodically,
+            args=(compact_interval,),
+            name="stargazer-cache-compactor",
+            daemon=True,
+        )
+        self._compactor.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: each statement is its own atomic transaction
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _index_existing_profiles(self):
+        # Caches from before the `seen` table existed get it filled in once
+        if self._conn.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is not None:
+            return
+        self._conn.create_function("url_key", 1, url_key, deterministic=True)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO seen (key, expires_at) "
+            "SELECT url_key(url), expires_at FROM profiles"
+        )
+
+    def _import_legacy_json(self, legacy_json: Path):
+        # One-off migration from the old full-file `stargazers_data.json` cache
+        if not legacy_json.exists():
+            return
+        with open(legacy_json, "r") as f:
+            data = json.load(f)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            expires_at = self._expiry(now, self.ttl)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO profiles (url, data, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (url, json.dumps(profile), now, expires_at)
+                    for url, profile in data.items()
+                ],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen (key, expires_at) VALUES (?, ?)",
+                [(url_key(url), expires_at) for url in data],
+            )
+            self._conn.execute("COMMIT")
+        legacy_json.rename(legacy_json.with_suffix(".json.migrated"))
+
+    @staticmethod
+    def _expiry(now: float, ttl: Optional[float]) -> Optional[float]:
+        return now + ttl if ttl is not None else None
+
+    def put(self, url: str, profile: dict, ttl: Optional[float] = None):
+        """Stores a single profile. `ttl` overrides the cache-wide TTL for this entry."""
+        now = time.time()
+        expires_at = self._expiry(now, ttl if ttl is not None else self.ttl)
+        key = url_key(url)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (url, data, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (url, json.dumps(profile), now, expires_at),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO seen (key, expires_at) VALUES (?, ?)",
+                (key, expires_at),
+            )
+            self._conn.execute("COMMIT")
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM profiles WHERE url = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (url, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def contains(self, url: str) -> bool:
+        """Whether an unexpired profile is cached for `url`, without loading it."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM seen WHERE key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (url_key(url), time.time()),
+            ).fetchone()
+        return row is not None
+
+    def keys(self) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM profiles WHERE expires_at IS NULL OR expires_at > ?",
+                (time.time(),),
+            ).fetchall()
+        return {url for (url,) in rows}
+
+    def compact(self):
+        """Drops expired profiles and folds the write-ahead log back into the database."""
+        conn = self._connect()
+        try:
+            now = time.time()
+            conn.execute(
+                "DELETE FROM profiles WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now,),
+            )
+            conn.execute(
+                "DELETE FROM seen WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now,),
+            )
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+
+    def _compact_periodically(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.compact()
+            except sqlite3.OperationalError as e:
+                # The database is busy, try again on the next tick
+                print(f"Skipping cache compaction: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._compactor.join()
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=None)
+def open_cache(
+    path: Path, ttl: Optional[float] = None, legacy_json: Optional[Path] = None
+) -> StargazerCache:
+    # Streamlit re-executes the main script on every interaction, so share one
+    # cache (and one compaction thread) per database file for the whole process
+    return StargazerCache(path, ttl=ttl, legacy_json=legacy_json)
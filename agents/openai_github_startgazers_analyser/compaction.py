@@ -0,0 +1,202 @@
+import re
+from typing import Callable, Optional
+
+# A compaction step takes markdown and returns a smaller version of it
+CompactionStep = Callable[[str], str]
+
+# Default token budget for a single profile sent to `tab.ask`
+PROFILE_TOKEN_BUDGET = 2_000
+
+# Lines of GitHub chrome that never say anything about the user: navigation,
+# footer, contribution-graph legend and cookie banners
+BOILERPLATE_LINE_PATTERNS = [
+    r"skip to content",
+    r"^(navigation menu|toggle navigation|search or jump to.*|search code, repositories, users, issues, pull requests.*)$",
+    r"^(sign in|sign up|product|solutions|resources|open source|enterprise|pricing)$",
+    r"^(footer|footer navigation|terms|privacy|security|status|docs|contact|manage cookies)$",
+    r"do not share my personal information",
+    r"^© \d{4} github",
+    r"you signed (in|out) (with|in) another tab or window",
+    r"you switched accounts on another tab or window",
+    r"reload to refresh your session",
+    r"dismiss alert",
+    r"^(less|more)$",
+    r"learn how we count contributions",
+    r"^(no )?\d* ?contributions? on \w+",
+    r"^contribution settings$",
+    r"^(block or report|report abuse|prevent this user from interacting)",
+    r"^(follow|sponsor|edit profile|customize your pins)$",
+    r"^(overview|projects|packages)(\s+\d+)?$",
+]
+# Whole blocks of GitHub chrome as (first line, last line) patterns. The last line is
+# dropped too unless it is the start of the profile, None drops until the end of the page.
+BOILERPLATE_BLOCKS = [
+    (r"^skip to content$", r"full-sized avatar"),
+    (r"^block or report", r"^\[report abuse\]\("),
+    (r"^contribution graph$", r"^more$"),
+    (r"^#+ footer$", None),
+]
+_BOILERPLATE_RE = re.compile(
+    "|".join(f"(?:{p})" for p in BOILERPLATE_LINE_PATTERNS), re.IGNORECASE
+)
+_LINK_RE = re.compile(r"(!?)\[([^\[\]]*)\]\(([^)\s]+)(?:\s+\"[^\"]*\")?\)")
+_HEADING_RE = re.compile(r"^#{1,6}\s")
+
+
+# Rough token count, GPT tokenizers average about four characters per token for English text
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _strip_markup(line: str) -> str:
+    line = _LINK_RE.sub(lambda m: m.group(2), line)
+    return line.strip().strip("#*_-|[]() ").strip()
+
+
+def _find_block_end(lines: list[str], start: int, end_pattern: Optional[str]):
+    if end_pattern is None:
+        return len(lines)
+    for i in range(start + 1, len(lines)):
+        if re.search(end_pattern, lines[i].strip(), re.IGNORECASE):
+            # Never drop the avatar line, it starts the actual profile
+            return i if "avatar" in end_pattern else i + 1
+    return None
+
+
+def strip_boilerplate(md: str) -> str:
+    """Drops navigation, footer and contribution-graph blocks and lines."""
+    lines = md.splitlines()
+    i = 0
+    without_blocks = []
+    while i < len(lines):
+        for start_pattern, end_pattern in BOILERPLATE_BLOCKS:
+            if re.search(start_pattern, lines[i].strip(), re.IGNORECASE):
+                end = _find_block_end(lines, i, end_pattern)
+                if end is not None:
+                    i = end
+                    break
+        else:
+            without_blocks.append(lines[i])
+            i += 1
+
+    kept = []
+    for line in without_blocks:
+        text = _strip_markup(line)
+        if text and _BOILERPLATE_RE.search(text):
+            continue
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def dedupe_links(md: str) -> str:
+    """Keeps the first occurrence of every link and reduces repeats to their text."""
+    seen_urls = set()
+
+    def replace(match: re.Match) -> str:
+        is_image, text, url = match.groups()
+        url = url.rstrip("/")
+        if url in seen_urls:
+            return "" if is_image else text
+        seen_urls.add(url)
+        return match.group(0)
+
+    # Images are matched before the links wrapping them, so links left without text
+    # (e.g. around a repeated badge) are dropped in a second pass
+    md = _LINK_RE.sub(replace, md)
+    return re.sub(r"(?<!!)\[\s*\]\([^)]*\)", "", md)
+
+
+def collapse_tables(md: str) -> str:
+    """Turns markdown tables into one line per row and drops rows without content."""
+    collapsed = []
+    for line in md.splitlines():
+        stripped = line.strip()
+        if not (stripped.startswith("|") and stripped.endswith("|")):
+            collapsed.append(line)
+            continue
+        cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+        # Separator rows (| --- | :-: |) and rows of empty cells, like the contribution graph
+        if all(not cell or re.fullmatch(r":?-+:?", cell) for cell in cells):
+            continue
+        collapsed.append("; ".join(cell for cell in cells if cell))
+    return "\n".join(collapsed)
+
+
+def collapse_blank_lines(md: str) -> str:
+    lines = [line.rstrip() for line in md.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def truncate_sections(md: str, token_budget: int) -> str:
+    """
+    Splits the markdown at headings and truncates sections so the whole page fits the
+    budget. Small sections are kept whole and their unused share goes to larger ones.
+    """
+    if estimate_tokens(md) <= token_budget:
+        return md
+
+    sections: list[list[str]] = [[]]
+    for line in md.splitlines():
+        if _HEADING_RE.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    texts = ["\n".join(section) for section in sections]
+
+    # Water-filling: hand out the budget evenly, smallest sections first
+    allowance = {}
+    remaining_budget = token_budget
+    order = sorted(range(len(texts)), key=lambda i: estimate_tokens(texts[i]))
+    for position, i in enumerate(order):
+        share = remaining_budget // (len(order) - position)
+        allowance[i] = min(estimate_tokens(texts[i]), share)
+        remaining_budget -= allowance[i]
+
+    truncated = []
+    for i, section in enumerate(sections):
+        max_chars = allowance[i] * 4
+        if len(texts[i]) <= max_chars:
+            truncated.extend(section)
+            continue
+        # Cut at whole lines, but always keep the first line (the heading)
+        used = 0
+        for j, line in enumerate(section):
+            if j > 0 and used + len(line) + 1 > max_chars:
+                break
+            truncated.append(line)
+            used += len(line) + 1
+        truncated.append("[...]")
+    return "\n".join(truncated)
+
+
+DEFAULT_STEPS: list[CompactionStep] = [
+    strip_boilerplate,
+    dedupe_links,
+    collapse_tables,
+    collapse_blank_lines,
+]
+
+
+class MarkdownCompactor:
+    """
+    Runs markdown through a list of compaction steps and then truncates it per
+    section to a token budget. Steps can be swapped, removed or added, e.g.
+    `MarkdownCompactor(steps=[*DEFAULT_STEPS, my_step])`.
+    """
+
+    def __init__(
+        self,
+        steps: Optional[list[CompactionStep]] = None,
+        token_budget: Optional[int] = PROFILE_TOKEN_BUDGET,
+    ):
+        self.steps = list(DEFAULT_STEPS if steps is None else steps)
+        self.token_budget = token_budget
+
+    def __call__(self, md: str) -> str:
+        for step in self.steps:
+            md = step(md)
+        if self.token_budget is not None:
+            md = truncate_sections(md, self.token_budget)
+        return md
+
+
+compact_profile_markdown = MarkdownCompactor()
@@ -0,0 +1,120 @@
+from typing import Optional
+
+from compaction import estimate_tokens
+
+# Prompt size the agent loop tries to stay under, and how much of a compacted tool
+# result is kept as a preview
+CONTEXT_TOKEN_BUDGET = 24_000
+TOOL_PREVIEW_TOKENS = 300
+
+
+def message_tokens(message: dict) -> int:
+    tokens = estimate_tokens(str(message.get("content") or ""))
+    for tool_call in message.get("tool_calls") or []:
+        tokens += estimate_tokens(tool_call.function.arguments)
+    # Role, name and separators
+    return tokens + 4
+
+
+def preview(text: str, max_tokens: int) -> str:
+    # Cut on a line or word boundary so the preview doesn't end mid-URL
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    return cut[:boundary] if boundary > limit // 2 else cut
+
+
+class ConversationContext:
+    """
+    The messages sent to the model on each iteration of the agent loop, kept under
+    a token budget.
+
+    Over budget, the oldest tool results are replaced with a short reference that
+    keeps their beginning (which says where the full data was saved), and after
+    that the oldest chat history is dropped, half at a time. Results from the
+    latest tool calls are always kept whole, since the model hasn't read them yet.
+
+    Nothing changes until the budget is exceeded, and a compacted message stays
+    compacted, so between compactions each request starts with exactly the same
+    messages as the one before and OpenAI's prompt caching keeps hitting.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        history: Optional[list[dict]] = None,
+        token_budget: int = CONTEXT_TOKEN_BUDGET,
+        preview_tokens: int = TOOL_PREVIEW_TOKENS,
+    ):
+        self.system = {"role": "system", "content": system_prompt}
+        self.token_budget = token_budget
+        self.preview_tokens = preview_tokens
+        self.messages: list[dict] = []
+        self._tokens: list[int] = []
+        self._compacted: set[int] = set()
+        # Messages from earlier chat turns, the first ones to go when over budget
+        self._history_len = 0
+        for message in history or []:
+            self.add(message)
+        self._history_len = len(self.messages)
+
+    @property
+    def total_tokens(self) -> int:
+        return message_tokens(self.system) + sum(self._tokens)
+
+    def add(self, message: dict):
+        self.messages.append(message)
+        self._tokens.append(message_tokens(message))
+
+    def extend(self, messages: list[dict]):
+        for message in messages:
+            self.add(message)
+
+    def build(self) -> list[dict]:
+        """The messages for the next request, compacted to fit the budget if needed."""
+        self._compact_tool_results()
+        self._drop_history()
+        return [self.system, *self.messages]
+
+    def _latest_tool_batch(self) -> int:
+        # Index of the last assistant message that called tools
+        for i in range(len(self.messages) - 1, -1, -1):
+            message = self.messages[i]
+            if message["role"] == "assistant" and message.get("tool_calls"):
+                return i
+        return len(self.messages)
+
+    def _compact_tool_results(self):
+        for i in range(self._latest_tool_batch()):
+            if self.total_tokens <= self.token_budget:
+                return
+            message = self.messages[i]
+            if message["role"] != "tool" or i in self._compacted:
+                continue
+            content = str(message["content"])
+            kept = preview(content, self.preview_tokens)
+            if len(kept) == len(content):
+                continue
+            self.messages[i] = {
+                **message,
+                "content": (
+                    f"[Earlier {message.get('name', 'tool')} result, compacted to save "
+                    f"context. It was {self._tokens[i]} tokens, this is how it starts:]\n"
+                    f"{kept}\n[...]"
+                ),
+            }
+            self._tokens[i] = message_tokens(self.messages[i])
+            self._compacted.add(i)
+
+    def _drop_history(self):
+        while self.total_tokens > self.token_budget and self._history_len > 0:
+            # Dropping half at once keeps the prefix stable for longer than
+            # trimming a message or two on every request
+            drop = max(1, self._history_len // 2)
+            del self.messages[:drop]
+            del self._tokens[:drop]
+            self._compacted = {i - drop for i in self._compacted if i >= drop}
+            self._history_len -= drop
+            print(f"Dropped the {drop} oldest chat messages to fit the context budget")
@@ -0,0 +1,58 @@
+from typing import AsyncIterator, Optional
+from urllib.parse import urljoin
+
+from dendrite import AsyncDendrite
+from pydantic import BaseModel, Field
+
+
+class StargazerPage(BaseModel):
+    profile_urls: list[str] = Field(
+        description="The full GitHub profile URL of every stargazer listed on this page"
+    )
+    next_page_url: Optional[str] = Field(
+        default=None,
+        description="The URL of the 'Next' pagination button, or null if this is the last page",
+    )
+
+
+# Keep the prompt identical for every page so Dendrite can reuse the cached extraction script
+STARGAZER_PAGE_PROMPT = (
+    "Get the profile URL of every stargazer on this page and the URL of the "
+    "'Next' pagination button if there is one"
+)
+
+
+async def iter_stargazer_urls(
+    client: AsyncDendrite, star_gazers_url: str, max_pages: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Follows GitHub's stargazer pagination and yields profile URLs as soon as each page
+    has been parsed, so profiles can be processed while later pages are still loading.
+    """
+    # Use a dedicated tab, the client's active page changes whenever a worker opens a tab
+    tab = await client.new_tab(star_gazers_url)
+    page_url: Optional[str] = star_gazers_url
+    visited = set()
+
+    try:
+        while page_url and page_url not in visited:
+            if max_pages is not None and len(visited) >= max_pages:
+                break
+            visited.add(page_url)
+            if tab.url != page_url:
+                await tab.goto(page_url)
+
+            page = await tab.extract(STARGAZER_PAGE_PROMPT, StargazerPage)
+            if page is None:
+                print(f"Could not extract stargazers from {page_url}, stopping")
+                break
+
+            for url in page.profile_urls:
+                yield urljoin(page_url, url)
+
+            if page.next_page_url:
+                page_url = urljoin(page_url, page.next_page_url)
+            else:
+                page_url = None
+    finally:
+        await tab.close()
@@ -0,0 +1,197 @@
+import asyncio
+from functools import lru_cache
+from typing import Optional, Type
+
+from openai import AsyncOpenAI
+from pydantic import BaseModel, Field, create_model
+
+from shared.tracing import TRACER
+
+# Profiles scored per LLM request, and how long a partial batch waits for more
+BATCH_SIZE = 8
+BATCH_MAX_WAIT = 2.0
+SCORING_MODEL = "gpt-4o"
+
+# Identical for every request, so it stays a cacheable prompt prefix
+SCORING_INSTRUCTIONS = (
+    "We are trying to find potential hires for a project and/or users to interview. "
+    "You will be given the markdown of one or more GitHub profiles, each under a "
+    "'Profile <n>' heading. Please get the requested information about each user "
+    "and put it in the matching profile_<n> field, put n/a for unavailable "
+    "information. Never mix up information between profiles."
+)
+
+
+class StarGazer(BaseModel):
+    full_name: str
+    username: str
+    bio: str
+    location: str
+    email: str
+    full_linkedin_url: str
+    full_twitter_url: str
+    personal_website_url: str
+    other_social_media: str
+    profile_pic_url: str
+    summary_of_repos: str = Field(
+        description=(
+            "Summerize what the star gazer has worked on and in what languages. "
+            "Emphasize cool things that they have worked on if available (and the urls of the repos), "
+            "if not, let me know that the profile is pretty empty. "
+            "Emphasize the any AI projects made in python or TS."
+        )
+    )
+    score: str = Field(
+        description=(
+            "Give a 'score' to the star gazer from 0 to 100 based on how promising they are. "
+            "A high score should be granted to candidates that have"
+            "worked on AI/llm projects (Web AI agents is best, but not required)"
+            "worked on projects in Python or TS"
+            "worked with web browser tools like Selenium, playwright"
+            "has experience working on open source projects. Do some reasoning here and then output the score."
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def batch_model(size: int) -> Type[BaseModel]:
+    # One required field per profile rather than a list, so structured outputs
+    # can't return too few profiles or shuffle them
+    fields = {f"profile_{i}": (StarGazer, ...) for i in range(1, size + 1)}
+    return create_model(f"StarGazers{size}", **fields)  # type: ignore
+
+
+async def score_profiles(
+    client: AsyncOpenAI, profiles: list[str], model: str = SCORING_MODEL
+) -> list[StarGazer]:
+    """Scores the markdown of each profile with one structured call, in order."""
+    sections = "\n\n".join(
+        f"# Profile {i}\n\n{markdown}" for i, markdown in enumerate(profiles, 1)
+    )
+    completion = await client.beta.chat.completions.parse(
+        model=model,
+        messages=[
+            {"role": "system", "content": SCORING_INSTRUCTIONS},
+            {"role": "user", "content": sections},
+        ],
+        response_format=batch_model(len(profiles)),
+    )
+    message = completion.choices[0].message
+    if message.parsed is None:
+        raise ValueError(f"No profiles in the response: {message.refusal}")
+    return [
+        getattr(message.parsed, f"profile_{i}") for i in range(1, len(profiles) + 1)
+    ]
+
+
+class ProfileBatcher:
+    """
+    Collects profile markdown from many tabs and scores it `batch_size` profiles
+    per LLM request, instead of one request per profile.
+
+    A batch is sent as soon as it's full, or `max_wait` seconds after its first
+    profile came in. When a batch fails, e.g. because the output didn't validate,
+    its profiles are scored again one per request so one bad profile can't sink
+    the others.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        batch_size: int = BATCH_SIZE,
+        max_wait: float = BATCH_MAX_WAIT,
+        model: str = SCORING_MODEL,
+    ):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.model = model
+        self.profiles = 0
+        self.requests = 0
+        self.fallbacks = 0
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def score(self, markdown: str) -> StarGazer:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((markdown, future))
+        self.profiles += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+        return await future
+
+    def flush(self):
+        """Sends the pending profiles now, without waiting for a full batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _score(self, profiles: list[str]) -> list[StarGazer]:
+        self.requests += 1
+        return await score_profiles(self.client, profiles, self.model)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]):
+        profiles = [markdown for markdown, _ in batch]
+        try:
+            try:
+                # Its own trace, a batch doesn't belong to any one profile
+                with TRACER.span("score_batch", root=True, profiles=len(batch)):
+                    results: list = await self._score(profiles)
+            except Exception as e:
+                if len(batch) == 1:
+                    results = [e]
+                else:
+                    print(
+                        f"Scoring a batch of {len(batch)} profiles failed, "
+                        f"scoring them one at a time: {e}"
+                    )
+                    self.fallbacks += 1
+                    singles = await asyncio.gather(
+                        *[self._score([markdown]) for markdown in profiles],
+                        return_exceptions=True,
+                    )
+                    results = [
+                        r if isinstance(r, BaseException) else r[0] for r in singles
+                    ]
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            # Don't leave anyone waiting if this batch was cancelled
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    async def close(self):
+        """Cancels the pending profiles and the batches still being scored."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        for _, future in batch:
+            future.cancel()
+        batches = list(self._batches)
+        for task in batches:
+            task.cancel()
+        await asyncio.gather(*batches, return_exceptions=True)
+
+    def metrics(self) -> dict:
+        return {
+            "profiles": self.profiles,
+            "requests": self.requests,
+            "failed_batches": self.fallbacks,
+        }
@@ -1,16 +1,46 @@
 import asyncio
+import heapq
 import json
+import os
+import re
+import sys
 
 import streamlit as st
-from dendrite import AsyncDendrite
-from dendrite.exceptions import PageConditionNotMet
+from dendrite import AsyncDendrite, AsyncPage
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
 from pathlib import Path
-from typing import Type
+from typing import Optional
 
 from openai import AsyncOpenAI
 
+# The helpers shared between the examples are in `shared/` at the root of the repo
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from cache import open_cache, url_key  # noqa: E402
+from compaction import compact_profile_markdown  # noqa: E402
+from conversation import ConversationContext  # noqa: E402
+from discovery import iter_stargazer_urls  # noqa: E402
+from scoring import ProfileBatcher  # noqa: E402
+from shared.adaptive_limiter import AdaptiveLimiter  # noqa: E402
+from shared.loop_runner import BackgroundLoop  # noqa: E402
+from shared.outbox import Outbox  # noqa: E402
+from shared.readiness import (  # noqa: E402
+    described,
+    dom_quiet,
+    network_idle,
+    wait_until_ready,
+)
+from shared.selector_cache import get_selector_cache  # noqa: E402
+from shared.streaming import Sink, open_sink  # noqa: E402
+from shared.tab_pool import AsyncTabPool  # noqa: E402
+from shared.tracing import (  # noqa: E402
+    TRACER,
+    JSONTraceExporter,
+    instrument_openai,
+    serve_metrics,
+    traced,
+)
+
 
 current_file_path = Path(__file__).resolve()
 env_path = current_file_path.parent / ".env"
@@ -18,24 +48,66 @@ load_dotenv(env_path, override=True)
 
 
 CACHE_DIR = Path("cache")
-CACHE_FILE = CACHE_DIR / "stargazers_data.json"
+CACHE_FILE = CACHE_DIR / "stargazers.sqlite3"
+LEGACY_CACHE_FILE = CACHE_DIR / "stargazers_data.json"
+# How long a fetched profile stays fresh, in seconds. None keeps profiles forever.
+CACHE_TTL = None
+
+# Bounds for the number of profiles processed in parallel tabs, the limiter settles
+# on a level in between. And how far discovery may run ahead of the workers.
+MIN_TAB_WORKERS = 2
+MAX_TAB_WORKERS = 20
+DISCOVERY_QUEUE_SIZE = 50
+# Warm tabs are closed and replaced after this many profiles
+TAB_MAX_USES = 25
+
+# Every analysed profile is appended to a file per repository, only the best
+# scoring ones are kept in memory and handed back to the model
+OUTPUT_DIR = Path("output")
+TOP_CANDIDATES = 20
+
+# Profiles read but not scored yet, a slow LLM holds back the tabs past this point
+MAX_PENDING_SCORES = 40
+
+# Queued and sent emails, and how long a tool call waits for its email to go out
+# before reporting it as queued
+OUTBOX_FILE = CACHE_DIR / "outbox.sqlite3"
+SEND_WAIT_TIMEOUT = 120
+
+# Seconds before an OpenAI request is abandoned and retried
+LLM_TIMEOUT = 60
+LLM_MAX_RETRIES = 2
+
+# Set TRACE_FILE to write a trace of every browser and LLM call that opens in
+# https://ui.perfetto.dev, and METRICS_PORT to serve their latencies to Prometheus
+TRACE_FILE = os.getenv("TRACE_FILE")
+METRICS_PORT = os.getenv("METRICS_PORT")
 
 
-def load_cached_data():
-    CACHE_DIR.mkdir(exist_ok=True)
-    if CACHE_FILE.exists():
-        with open(CACHE_FILE, "r") as f:
-            data = json.load(f)
-            return set(data.keys()), data
-    return set(), {}
+def get_cache():
+    return open_cache(CACHE_FILE, ttl=CACHE_TTL, legacy_json=LEGACY_CACHE_FILE)
 
 
-def save_cached_data(data):
-    with open(CACHE_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+def save_cached_data(url, data):
+    get_cache().put(url, data)
+
+
+def parse_score(score: str) -> int:
+    # The model reasons before giving the score, so the score is the last number
+    numbers = re.findall(r"\d+", score)
+    return int(numbers[-1]) if numbers else 0
+
+
+def output_file(star_gazers_url: str) -> Path:
+    # e.g. https://github.com/owner/repo/stargazers -> output/owner_repo_stargazers.ndjson
+    slug = re.sub(r"\W+", "_", star_gazers_url.split("://")[-1].split("/", 1)[-1])
+    return OUTPUT_DIR / f"{slug.strip('_')}.ndjson"
 
 
 class GetStargazersTool:
+    # How many calls to this tool may run at once, each call already uses many tabs
+    max_concurrency = 2
+
     @staticmethod
     def get_function_schema():
         return {
@@ -58,81 +130,156 @@ class GetStargazersTool:
 
     @staticmethod
     async def execute(star_gazers_url: str) -> str:
-        fetched_users, all_star_gazers = load_cached_data()
-        new_star_gazers = {}
-        semaphore = asyncio.Semaphore(10)
-
-        async def open_stargazer_in_tab(url, client: AsyncDendrite):
-            async with semaphore:
-                tab = await client.new_tab(url)
-                try:
-                    await tab.wait_for(
-                        "The entire profile to have loaded, including repositories if any, etc. Usually only takes a few seconds."
-                    )
-                except PageConditionNotMet:
-                    print(f"Page condition not met for {url}, proceeding anyways")
-
-                md = await tab.markdown()
-
-                class StarGazer(BaseModel):
-                    full_name: str
-                    username: str
-                    bio: str
-                    location: str
-                    email: str
-                    full_linkedin_url: str
-                    full_twitter_url: str
-                    personal_website_url: str
-                    other_social_media: str
-                    profile_pic_url: str
-                    summary_of_repos: str = Field(
-                        description=(
-                            "Summerize what the star gazer has worked on and in what languages. "
-                            "Emphasize cool things that they have worked on if available (and the urls of the repos), "
-                            "if not, let me know that the profile is pretty empty. "
-                            "Emphasize the any AI projects made in python or TS."
-                        )
-                    )
-                    score: str = Field(
-                        description=(
-                            "Give a 'score' to the star gazer from 0 to 100 based on how promising they are. "
-                            "A high score should be granted to candidates that have"
-                            "worked on AI/llm projects (Web AI agents is best, but not required)"
-                            "worked on projects in Python or TS"
-                            "worked with web browser tools like Selenium, playwright"
-                            "has experience working on open source projects. Do some reasoning here and then output the score."
-                        )
-                    )
-
-                info = await tab.ask(
-                    (
-                        f"We are trying to find potential hires for a project and/or users to interview. "
-                        f"Please get the requested information about the user, put n/a for unavailable information,"
-                        f"here is some markdown from the page: {md}"
-                    ),
-                    StarGazer,
+        output = output_file(star_gazers_url)
+        async with AsyncDendrite(auth="github.com") as client:
+            with open_sink(output, append=True) as sink:
+                count, top_star_gazers = await GetStargazersTool.collect(
+                    client, star_gazers_url, sink=sink
                 )
-                new_star_gazers[url] = info.model_dump()
-                all_star_gazers[url] = info.model_dump()
-                save_cached_data(all_star_gazers)
-                await tab.close()
+        print(f"Analysed {count} new star gazers, saved to {output}")
 
-        async with AsyncDendrite(auth="github.com") as client:
-            await client.goto(star_gazers_url)
-            all_urls = await client.extract(
-                "Get the URLS of every stargazer as an array of strings"
+        return (
+            f"Analysed {count} new star gazers, all of them are saved to {output}. "
+            f"These are the {len(top_star_gazers)} with the highest scores: {top_star_gazers}"
+        )
+
+    @staticmethod
+    async def collect(
+        client: AsyncDendrite,
+        star_gazers_url: str,
+        limiter: Optional[AdaptiveLimiter] = None,
+        sink: Optional[Sink] = None,
+        top_k: int = TOP_CANDIDATES,
+    ) -> tuple[int, list[dict]]:
+        """
+        Analyses every new stargazer, writing each profile to `sink` and the cache as
+        soon as it's done. Returns how many were analysed and the `top_k` best ones.
+        """
+        if limiter is None:
+            limiter = AdaptiveLimiter(
+                initial=MIN_TAB_WORKERS,
+                min_limit=MIN_TAB_WORKERS,
+                max_limit=MAX_TAB_WORKERS,
             )
-            # Only look at new URLs that we haven't seen before and process them 10 at a time
-            new_urls = [url for url in all_urls if url not in fetched_users]
-            await asyncio.gather(
-                *[open_stargazer_in_tab(url, client) for url in new_urls]
+        client = traced(client)
+        # One worker per possible slot, the limiter decides how many run at once
+        num_workers = limiter.max_limit
+        cache = get_cache()
+        # Hashes of the URLs queued in this run, profiles cached by earlier runs are
+        # looked up in the cache's index instead of being loaded into memory
+        queued: set[int] = set()
+        count = 0
+        # Profiles are scored several per LLM request, once their markdown is read
+        batcher = ProfileBatcher(get_openai())
+        scoring_slots = asyncio.Semaphore(MAX_PENDING_SCORES)
+        scoring: set[asyncio.Task] = set()
+        # Min-heap of (score, order, profile), the lowest score is dropped first
+        top: list[tuple[int, int, dict]] = []
+
+        async def read_profile(tab: AsyncPage) -> str:
+            # Cheap network and DOM checks first, so the LLM is only asked once the
+            # page has settled
+            await wait_until_ready(
+                tab,
+                network_idle(),
+                dom_quiet(),
+                described(
+                    "The entire profile to have loaded, including repositories if any, etc. Usually only takes a few seconds."
+                ),
+                timeout=30,
             )
-            print(f"Got these star gazers: {new_star_gazers}")
 
-        return f"Got these star gazers: {new_star_gazers}"
+            # Strip GitHub navigation, footer and contribution-graph noise before
+            # scoring
+            return compact_profile_markdown(await tab.markdown())
+
+        def record(url, profile: dict):
+            nonlocal count
+            entry = {"url": url, **profile}
+            if sink is not None:
+                sink.write(entry)
+            # Only marked as seen once it's in the output, so a profile that never
+            # got there is analysed again by the next run instead of skipped
+            save_cached_data(url, profile)
+            count += 1
+            heapq.heappush(top, (parse_score(profile["score"]), count, entry))
+            if len(top) > top_k:
+                heapq.heappop(top)
+
+        async with AsyncTabPool(
+            client, size=num_workers, max_uses=TAB_MAX_USES
+        ) as pool:
+            # Discovery feeds the workers through a bounded queue, so profiles are
+            # processed while later stargazer pages are still being crawled
+            queue: asyncio.Queue = asyncio.Queue(maxsize=DISCOVERY_QUEUE_SIZE)
+
+            async def discover():
+                try:
+                    async for url in iter_stargazer_urls(client, star_gazers_url):
+                        # Only look at new URLs that we haven't seen before
+                        key = url_key(url)
+                        if key not in queued and not cache.contains(url):
+                            queued.add(key)
+                            await queue.put(url)
+                finally:
+                    for _ in range(num_workers):
+                        await queue.put(None)
+
+            async def score(url, md: str):
+                try:
+                    profile = await batcher.score(md)
+                    record(url, profile.model_dump())
+                except Exception as e:
+                    print(f"Failed to score {url}: {e}")
+                finally:
+                    scoring_slots.release()
+
+            async def worker():
+                while (url := await queue.get()) is not None:
+                    try:
+                        with TRACER.span("read_profile", root=True, url=url):
+                            async with limiter.slot(), pool.tab(url) as tab:
+                                md = await read_profile(tab)
+                    except Exception as e:
+                        print(f"Failed to process {url}: {e}")
+                        continue
+                    # The tab is free again, scoring happens in the background
+                    await scoring_slots.acquire()
+                    task = asyncio.create_task(score(url, md))
+                    scoring.add(task)
+                    task.add_done_callback(scoring.discard)
+
+            with TRACER.recording() as timings:
+                tasks = [asyncio.ensure_future(discover())]
+                tasks += [asyncio.ensure_future(worker()) for _ in range(num_workers)]
+                try:
+                    await asyncio.gather(*tasks)
+                    # No more profiles are coming, don't wait for the last batch to
+                    # fill
+                    batcher.flush()
+                    await asyncio.gather(*scoring)
+                finally:
+                    # When discovery or a worker fails, stop whatever is still
+                    # running before the tab pool and the sink are closed under it
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    leftover = list(scoring)
+                    for task in leftover:
+                        task.cancel()
+                    await asyncio.gather(*leftover, return_exceptions=True)
+                    await batcher.close()
+
+        print(f"Concurrency limiter: {limiter.metrics()}")
+        print(f"Profile scoring: {batcher.metrics()}")
+        print(f"Time spent per call:\n{timings.table()}")
+        return count, [profile for _, _, profile in sorted(top, reverse=True)]
 
 
 class SendEmailTool:
+    # Calls only queue their email, the outbox sends them one at a time
+    max_concurrency = 10
+
     @staticmethod
     def get_function_schema():
         return {
@@ -160,62 +307,111 @@ class SendEmailTool:
 
     @staticmethod
     async def execute(email_address: str, subject: str, body: str) -> str:
-        client = AsyncDendrite(auth="outlook.live.com")
+        email = await get_outbox().send(
+            email_address, subject, body, timeout=SEND_WAIT_TIMEOUT
+        )
+        return email.describe()
 
-        await client.goto("https://outlook.live.com/mail/0/")
-        await client.click("The new email button")
-        await client.fill("to_field", email_address)
-        await client.press("Enter")
-        await client.fill("subject_field", subject)
-        await client.fill("body_field", body)
-        await client.click("The send button")
 
-        return "Email sent successfully"
+class GetEmailStatusTool:
+    max_concurrency = 1
+
+    @staticmethod
+    def get_function_schema():
+        return {
+            "type": "function",
+            "function": {
+                "name": "get_email_status",
+                "description": "Lists the recently sent emails and whether they were sent, are still queued or failed.",
+                "parameters": {"type": "object", "properties": {}},
+            },
+        }
+
+    @staticmethod
+    async def execute() -> str:
+        emails = get_outbox().recent()
+        if not emails:
+            return "No emails have been sent yet"
+        return "\n".join(email.describe() for email in emails)
+
+
+TOOLS = [GetStargazersTool, SendEmailTool, GetEmailStatusTool]
+# Built once, tool calls are dispatched by name
+TOOL_REGISTRY = {tool.get_function_schema()["function"]["name"]: tool for tool in TOOLS}
+FUNCTION_SCHEMAS = [tool.get_function_schema() for tool in TOOLS]
+
+
+async def run_tool_call(tool_call, limits: dict) -> dict:
+    tool_name = tool_call.function.name
+    tool = TOOL_REGISTRY.get(tool_name)
+    if tool is None:
+        result = f"Unknown tool: {tool_name}"
+    else:
+        try:
+            tool_args = json.loads(tool_call.function.arguments)
+            async with limits[tool_name]:
+                print(f"Executing tool: {tool_name}")
+                with TRACER.span(f"tool.{tool_name}"):
+                    result = await tool.execute(**tool_args)
+        except Exception as e:
+            print(f"Tool {tool_name} failed: {e}")
+            result = f"Error while running {tool_name}: {e}"
+
+    return {
+        "role": "tool",
+        "name": tool_name,
+        "content": str(result),
+        "tool_call_id": tool_call.id,
+    }
+
+
+# Kept identical between requests, so it stays a cacheable prompt prefix
+SYSTEM_PROMPT = (
+    "Your job is to help me find promising hires/interviewees for the project 'Dendrite' which is a Python SDK for "
+    "building tools for AI agents so they can browse the web. "
+    "You can include markdown formatting in your responses. When showing user profiles, "
+    "format them nicely with their profile picture (using ![name](url)) and other details in a structured way. "
+    "Use markdown tables, headers, and other formatting to make the information easy to read. E.g:\n"
+    "### John Doe\n"
+    "![avatar](https://avatars.githubusercontent.com/u/12345)\n"
+    "- **Location**: San Francisco\n"
+    "- **Bio**: AI Engineer passionate about LLMs\n"
+    "...\n\n"
+    "To stop calling functions and ask the user a question, simply respond with a message without a function call."
+)
 
 
 async def process_user_input(prompt, messages):
-    client = AsyncOpenAI()
-
-    current_messages = [
-        {
-            "role": "system",
-            "content": (
-                "Your job is to help me find promising hires/interviewees for the project 'Dendrite' which is a Python SDK for "
-                "building tools for AI agents so they can browse the web. "
-                "You can include markdown formatting in your responses. When showing user profiles, "
-                "format them nicely with their profile picture (using ![name](url)) and other details in a structured way. "
-                "Use markdown tables, headers, and other formatting to make the information easy to read. E.g:\n"
-                "### John Doe\n"
-                "![avatar](https://avatars.githubusercontent.com/u/12345)\n"
-                "- **Location**: San Francisco\n"
-                "- **Bio**: AI Engineer passionate about LLMs\n"
-                "...\n\n"
-                "To stop calling functions and ask the user a question, simply respond with a message without a function call."
-            ),
-        }
-    ]
+    client = get_openai()
 
-    # Add historical messages from the session state
-    for msg in messages:
-        current_messages.append({"role": msg["role"], "content": msg["content"]})
+    # Historical messages from the session state, which already end with the
+    # current prompt when called from the chat UI
+    history = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+    if history and history[-1] == {"role": "user", "content": prompt}:
+        history.pop()
+    context = ConversationContext(SYSTEM_PROMPT, history)
 
     # Add the current prompt
-    current_messages.append({"role": "user", "content": prompt})
+    context.add({"role": "user", "content": prompt})
 
-    tools = [GetStargazersTool, SendEmailTool]
-    function_schemas = [tool.get_function_schema() for tool in tools]
+    limits = {
+        name: asyncio.Semaphore(tool.max_concurrency)
+        for name, tool in TOOL_REGISTRY.items()
+    }
 
     while True:
+        current_messages = context.build()
+        print(f"Sending {context.total_tokens} tokens of context")
         response = await client.chat.completions.create(
             model="gpt-4o",
             messages=current_messages,  # type: ignore
-            tools=function_schemas,
+            tools=FUNCTION_SCHEMAS,
             tool_choice="auto",
         )
         message = response.choices[0].message
 
         # Add assistant's message to history
-        current_messages.append(
+        context.add(
             {
                 "role": "assistant",
                 "content": message.content or "",
@@ -227,30 +423,62 @@ async def process_user_input(prompt, messages):
         if not message.tool_calls:
             return message.content
 
-        for tool_call in message.tool_calls:
-            tool_call_id = tool_call.id
-            tool_name = tool_call.function.name
-            tool_args = json.loads(tool_call.function.arguments)
+        # Independent tool calls from the same message run concurrently, the results
+        # come back in the original call order
+        tool_messages = await asyncio.gather(
+            *[run_tool_call(tool_call, limits) for tool_call in message.tool_calls]
+        )
+        context.extend(tool_messages)
+
+
+# One event loop per Streamlit server, shared by every session and chat turn
+@st.cache_resource
+def get_event_loop() -> BackgroundLoop:
+    runner = BackgroundLoop()
+    # Closes the Outlook session, which saves its login
+    runner.on_shutdown(get_outbox().close)
+    # Emails still queued from an earlier run go out again
+    runner.submit(get_outbox().start())
+    return runner
 
-            # Find the matching tool and execute it
-            for tool in tools:
-                if tool.get_function_schema()["function"]["name"] == tool_name:
-                    print(
-                        f"Executing tool: {tool.get_function_schema()['function']['name']}"
-                    )
-                    result = await tool.execute(**tool_args)
-                    current_messages.append(
-                        {
-                            "role": "tool",
-                            "name": tool_name,
-                            "content": str(result),
-                            "tool_call_id": tool_call_id,
-                        }
-                    )
-                    break
+
+# Emails are sent one at a time from a single Outlook session, kept open between
+# emails and chat turns
+@st.cache_resource
+def get_outbox() -> Outbox:
+    return Outbox(OUTBOX_FILE)
+
+
+# Every turn runs on that one loop, so a single client and its connection pool
+# serve all sessions
+@st.cache_resource
+def get_openai() -> AsyncOpenAI:
+    return instrument_openai(
+        AsyncOpenAI(timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES)
+    )
+
+
+# Once per Streamlit server, spans from every session go to the same exporters
+@st.cache_resource
+def start_tracing():
+    if TRACE_FILE:
+        TRACER.add_exporter(JSONTraceExporter(Path(TRACE_FILE)))
+        print(f"Writing a trace of every browser and LLM call to {TRACE_FILE}")
+    if METRICS_PORT:
+        serve_metrics(int(METRICS_PORT))
+
+
+# Once per Streamlit server, so the Outlook selectors are in memory from the first
+# email on
+@st.cache_resource
+def warm_up_selectors():
+    get_selector_cache().warmup(["outlook.live.com"])
 
 
 def main():
+    start_tracing()
+    warm_up_selectors()
+
     # Initialize messages if they don't exist in session state
     if "messages" not in st.session_state:
         st.session_state.messages = []
@@ -273,7 +501,7 @@ def main():
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
             message_placeholder.markdown("Thinking...")
-            full_response = asyncio.run(
+            full_response = get_event_loop().run(
                 process_user_input(prompt, st.session_state.messages)
             )
             # Use unsafe_allow_html=True for the assistant's response
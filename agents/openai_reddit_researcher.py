@@ -5,29 +5,43 @@
 #
 # Uses OpenAI for natural language processing and Dendrite for browsing the web,
 # enabling automated research on any topic using Reddit.
+#
+# Posts are fetched concurrently, each post is summarized as soon as it arrives
+# (map) and the summaries are merged in rounds that fit a token budget (reduce).
+# Every LLM call is awaited, so browser and LLM work overlap.
 
+import asyncio
 import json
-from dendrite import Dendrite
+from dendrite import AsyncDendrite
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
-from openai import OpenAI
 import re
 
+from llm_client import achat_completion
+
 
 load_dotenv()
 
 
-# Simple function that uses OpenAI's API to generate a response to a prompt
-def ai(prompt: str, output_json: bool = False):
-    openai = OpenAI()
+# How many posts are fetched in parallel tabs
+MAX_CONCURRENT_POSTS = 5
+# Token budgets for a single post in the map step and for the merged summaries in the reduce step
+POST_TOKEN_BUDGET = 12_000
+SUMMARY_TOKEN_BUDGET = 8_000
+
+
+# Rough token count, GPT tokenizers average about four characters per token for English text
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _json_prompt(prompt: str, output_json: bool) -> str:
     if output_json:
         prompt += "\n\nYour output must be contain valid JSON wrapped in a json code block. E.g ```json\n[your output]\n```"
-    messages = [{"role": "user", "content": prompt}]
-    oai_res = openai.chat.completions.create(
-        messages=messages,  # type: ignore
-        model="gpt-4o",
-    )
-    message = oai_res.choices[0].message.content
+    return prompt
+
+
+def _parse_ai_message(message, output_json: bool):
     print("\n\n========= AI message =========\n", message, "\n================")
     if message:
         if output_json:
@@ -39,52 +53,131 @@ def ai(prompt: str, output_json: bool = False):
     raise Exception("Failed to get successful response from Open AI.")
 
 
-# This function uses Dendrite to search for posts on reddit and summerize them based of a given topic
-def search_and_summarize_reddit(topic_to_research: str):
-    browser = Dendrite()
+# Simple function that uses OpenAI's API to generate a response to a prompt without
+# blocking the event loop, set LLM_CACHE=1 to reuse responses from earlier runs
+async def ai(prompt: str, output_json: bool = False):
+    messages = [{"role": "user", "content": _json_prompt(prompt, output_json)}]
+    message = await achat_completion(messages, model="gpt-4o")
+    return _parse_ai_message(message, output_json)
+
+
+# Map step: condense a single post to what matters for the research question
+async def summarize_post(topic_to_research: str, post_data: str) -> str:
+    # Cut very long threads so a single post can't blow the context window
+    post_data = str(post_data)[: POST_TOKEN_BUDGET * 4]
+    return await ai(
+        f"Summarize what this Reddit post and its comments say about the research question: '{topic_to_research}'. "
+        + "Keep concrete opinions, experiences, pros and cons. If nothing is relevant, say so in one sentence.\n\n"
+        + f"POST:\n{post_data}"
+    )
+
+
+# Splits the summaries into consecutive groups of at least two that each fit the token budget
+def group_summaries(summaries: list[str], token_budget: int) -> list[list[str]]:
+    groups: list[list[str]] = []
+    current: list[str] = []
+    current_tokens = 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if len(current) >= 2 and current_tokens + tokens > token_budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+# Reduce step: merge summaries in parallel rounds until they all fit in one final prompt
+async def reduce_summaries(
+    topic_to_research: str, summaries: list[str], token_budget: int
+) -> str:
+    while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > token_budget:
+        groups = group_summaries(summaries, token_budget)
+        summaries = await asyncio.gather(
+            *[
+                ai(
+                    f"Merge these summaries of Reddit posts into one summary about the research question: '{topic_to_research}'. "
+                    + "Keep every distinct opinion and note how common it is.\n\n"
+                    + "\n\n".join(f"SUMMARY:\n{summary}" for summary in group)
+                )
+                for group in groups
+            ]
+        )
+
+    joined = "\n\n".join(f"SUMMARY:\n{summary}" for summary in summaries)
+    return await ai(
+        f"Based of these summaries of Reddit posts, please help the user with their research question: '{topic_to_research}' "
+        + f"Here are the summaries:\n{joined}"
+    )
+
+
+# This function uses Dendrite to search for posts on reddit and summerize them based of a given topic,
+# the total time is close to the slowest single post
+async def search_and_summarize_reddit(
+    topic_to_research: str,
+    max_concurrent_posts: int = MAX_CONCURRENT_POSTS,
+    token_budget: int = SUMMARY_TOKEN_BUDGET,
+):
+    browser = AsyncDendrite()
 
     # Generate search query from the user's topic
-    search_query = ai(
+    search_query = await ai(
         f"Generate a simple reddit search query for this research topic: '{topic_to_research}'"
         + "Output should be only be 1-3 keywords and nothing else. No quotes."
     )
 
-    # Navigate to the search result page
+    # Navigate to the search result page and extract the search results
     url = f"https://www.reddit.com/search/?q={quote_plus(search_query)}"
-    browser.goto(url)
-
-    # Extract search results
-    search_data = browser.extract(
+    await browser.goto(url)
+    search_data = await browser.extract(
         "Get a list of dicts like so {subreddit: str, comment_amount: str, title: str, upvotes: str, url: str}"
     )
 
     # Get the urls of the posts that are related to the user's topic
-    urls = ai(
+    urls = await ai(
         f"Output the urls for all posts relevant to as a list of strings: '{topic_to_research}'\n\nPosts: {search_data}",
         output_json=True,
     )
 
-    # Extract the content from each post with Dendrite by opening several tabs
-    posts = ""
-    for url in urls:
-        tab = browser.new_tab(url)
-        post_data = tab.extract(
-            "get the text content from the post and all the comments."
+    semaphore = asyncio.Semaphore(max_concurrent_posts)
+
+    # Fetch a post in its own tab and summarize it right away, the tab is
+    # released before summarizing so the next post can start loading
+    async def fetch_and_summarize(url: str):
+        async with semaphore:
+            tab = await browser.new_tab(url)
+            try:
+                post_data = await tab.extract(
+                    "get the text content from the post and all the comments."
+                )
+            finally:
+                await tab.close()
+        return await summarize_post(topic_to_research, post_data)
+
+    try:
+        results = await asyncio.gather(
+            *[fetch_and_summarize(url) for url in urls], return_exceptions=True
         )
-        posts += f"\n\nPOST:\n{post_data}"
-        print("post_data: ", post_data)
-        tab.close()
-
-    # Summarize the posts with OpenAI
-    summary = ai(
-        f"Based of these posts, please help the user with their research question: '{topic_to_research}' "
-        + f"Here are the posts:\n{posts}"
-    )
+    finally:
+        await browser.close()
 
-    return summary
+    summaries = []
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            print(f"Skipping {url}, failed to fetch or summarize: {result}")
+        else:
+            summaries.append(result)
 
+    return await reduce_summaries(topic_to_research, summaries, token_budget)
 
-# Uses Dendrite to search Reddit and summarize the results
-summary = search_and_summarize_reddit(
-    "What are people's opinions on CrewAI? Do people like it?"
-)
+
+if __name__ == "__main__":
+    # Uses Dendrite to search Reddit and summarize the results
+    summary = asyncio.run(
+        search_and_summarize_reddit(
+            "What are people's opinions on CrewAI? Do people like it?"
+        )
+    )
+    print(summary)
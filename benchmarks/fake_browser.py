@@ -0,0 +1,221 @@
+# A stand-in for AsyncDendrite that fetches pages from the fixture server over HTTP,
+# so the pipelines can be benchmarked without a real browser, network or API key.
+#
+# It implements the subset of the AsyncDendrite / AsyncPage API the examples use.
+# `extract` returns the JSON embedded in each fixture page and `ask` goes to the
+# fixture server's fake LLM, so timings include the simulated page and LLM latency.
+
+import asyncio
+import html
+import json
+import re
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from pydantic import BaseModel, TypeAdapter
+
+# Fixture requests that can be in flight at once, each blocks a thread while the
+# server simulates its latency
+MAX_REQUESTS = 128
+
+DATA_PATTERN = re.compile(
+    r'<script type="application/json" id="fixture-data">(.*?)</script>', re.S
+)
+
+
+class LatencyRecorder:
+    """
+    Collects how long each item page is held by a tab, from the navigation to it
+    until the tab moves on or closes. Item pages are the URLs matching `pattern`.
+    """
+
+    def __init__(self, pattern: str):
+        self.pattern = re.compile(pattern)
+        self.latencies: list[float] = []
+
+    def is_item(self, url: Optional[str]) -> bool:
+        return bool(url and self.pattern.search(url))
+
+
+class FakeLocator:
+    def __init__(self, tab: "FixtureTab", selector: str):
+        self._tab = tab
+        self._selector = selector
+
+    async def count(self) -> int:
+        # Only tag selectors, enough for the readiness checks
+        tag = re.escape(self._selector.split(".")[0] or "div")
+        return len(re.findall(rf"<{tag}[\s>]", self._tab._html))
+
+
+class FakePlaywrightPage:
+    # The few Playwright calls AsyncTabPool and the readiness checks make on
+    # `tab.playwright_page`. Fixture pages are static, so they're always settled.
+    def __init__(self, tab: "FixtureTab"):
+        self._tab = tab
+
+    def is_closed(self) -> bool:
+        return self._tab.closed
+
+    async def goto(self, url: str, **kwargs):
+        await self._tab.goto(url)
+
+    async def wait_for_load_state(self, state: str = "load", **kwargs):
+        return None
+
+    def on(self, event: str, handler):
+        # Fixture pages make no requests of their own once they're loaded, so
+        # there are no request events to report
+        pass
+
+    async def evaluate(self, script: str, *args):
+        # Only used for the DOM quiet check, no mutations ever happen here
+        return float("inf")
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(self._tab, selector)
+
+
+class FixtureTab:
+    def __init__(self, browser: "FixtureBrowser"):
+        self.browser = browser
+        self.url: Optional[str] = None
+        self.closed = False
+        self.playwright_page = FakePlaywrightPage(self)
+        self._html = ""
+        self._data: Any = None
+        self._item_started: Optional[float] = None
+
+    def _finish_item(self):
+        if self._item_started is not None:
+            self.browser.recorder.latencies.append(
+                time.perf_counter() - self._item_started
+            )
+            self._item_started = None
+
+    async def goto(self, url: str, **kwargs):
+        self._finish_item()
+        self.url = url
+        if self.browser.recorder.is_item(url):
+            self._item_started = time.perf_counter()
+        if url == "about:blank":
+            self._html, self._data = "", None
+            return
+
+        self._html = await self.browser.request(url)
+        match = DATA_PATTERN.search(self._html)
+        self._data = json.loads(match.group(1)) if match else None
+
+    async def extract(self, prompt: Optional[str] = None, type_spec=None, **kwargs):
+        if type_spec is None:
+            return self._data
+        return TypeAdapter(type_spec).validate_python(self._data)
+
+    async def ask(self, prompt: str, type_spec=None, **kwargs):
+        page = await self.markdown()
+        messages = [{"role": "user", "content": f"{prompt}\n\n{page}"}]
+        request: dict = {"model": "fake-ask", "messages": messages}
+        if type_spec is not None:
+            schema = TypeAdapter(type_spec).json_schema()
+            request["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "answer", "schema": schema},
+            }
+
+        response = await self.browser.request(
+            f"{self.browser.base_url}/v1/chat/completions", request
+        )
+        content = json.loads(response)["choices"][0]["message"]["content"]
+        if type_spec is None:
+            return content
+        if isinstance(type_spec, type) and issubclass(type_spec, BaseModel):
+            return type_spec.model_validate_json(content)
+        return TypeAdapter(type_spec).validate_json(content)
+
+    async def markdown(self, prompt: Optional[str] = None) -> str:
+        # Good enough for benchmarking, one line per block element
+        body = re.sub(r"<script.*?</script>", "", self._html, flags=re.S)
+        text = re.sub(r"<(br|/p|/li|/tr|/h\d|/div|/nav)>", "\n", body)
+        text = re.sub(r"<[^>]+>", " ", text)
+        return "\n".join(
+            line.strip() for line in html.unescape(text).splitlines() if line.strip()
+        )
+
+    async def wait_for(self, prompt: str, timeout: Optional[float] = None, **kwargs):
+        # Fixture pages are complete as soon as `goto` returns
+        return None
+
+    async def fill(self, prompt: str, value: str, **kwargs):
+        return None
+
+    async def click(self, prompt: str, **kwargs):
+        return None
+
+    async def press(self, keys: str, **kwargs):
+        return None
+
+    async def close(self):
+        self._finish_item()
+        self.closed = True
+
+
+def _fetch(url: str, body: Optional[dict]) -> str:
+    # urlopen raises HTTPError for anything but a success
+    data = None if body is None else json.dumps(body).encode()
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"} if data else {}
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read().decode()
+
+
+class FixtureBrowser:
+    def __init__(self, base_url: str, recorder: LatencyRecorder):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        # urllib like the fixture server, on threads of its own so the requests
+        # aren't limited by the size of the loop's default executor
+        self._http = ThreadPoolExecutor(MAX_REQUESTS, thread_name_prefix="fixture")
+        self._active: Optional[FixtureTab] = None
+
+    async def request(self, url: str, body: Optional[dict] = None) -> str:
+        """GETs `url`, or POSTs `body` to it as JSON, and returns the response text."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._http, _fetch, url, body)
+
+    async def new_tab(self, url: Optional[str] = None, **kwargs) -> FixtureTab:
+        tab = FixtureTab(self)
+        self._active = tab
+        if url is not None:
+            await tab.goto(url)
+        return tab
+
+    async def _active_tab(self) -> FixtureTab:
+        if self._active is None or self._active.closed:
+            return await self.new_tab()
+        return self._active
+
+    async def goto(self, url: str, **kwargs) -> FixtureTab:
+        tab = await self._active_tab()
+        await tab.goto(url)
+        return tab
+
+    async def extract(self, prompt: Optional[str] = None, type_spec=None, **kwargs):
+        return await (await self._active_tab()).extract(prompt, type_spec, **kwargs)
+
+    async def ask(self, prompt: str, type_spec=None, **kwargs):
+        return await (await self._active_tab()).ask(prompt, type_spec, **kwargs)
+
+    async def fill(self, prompt: str, value: str, **kwargs):
+        return None
+
+    async def close(self):
+        self._http.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,314 @@
+# Local HTTP fixture server for offline benchmarks. It serves deterministic pages
+# that look like the sites the examples crawl, plus a fake OpenAI-compatible LLM:
+#
+#   /companies                       YC-like company directory
+#   /companies/company-<n>           YC-like company page
+#   /news, /item?id=<n>              HN-like front page and posts
+#   /<owner>/<repo>/stargazers       GitHub-like paginated stargazer list (?page=<n>)
+#   /users/<username>                GitHub-like profile page
+#   POST /v1/chat/completions        Deterministic fake LLM
+#
+# Every page embeds the data a perfect extraction would return as JSON in
+# <script id="fixture-data">, which is what the fake browser's `extract` returns.
+#
+#   python benchmarks/fixture_server.py --port 8765 --page-latency-ms 200
+
+import argparse
+import hashlib
+import html
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class FixtureConfig:
+    num_companies: int = 200
+    num_posts: int = 30
+    num_stargazers: int = 300
+    stargazers_per_page: int = 48
+    # Simulated page load time, jitter is added on top and is deterministic per URL
+    page_latency: float = 0.2
+    page_jitter: float = 0.1
+    # Simulated LLM time to first token plus time per 1000 prompt tokens
+    llm_latency: float = 0.5
+    llm_latency_per_1k_tokens: float = 0.05
+
+
+def _seed(*parts: Any) -> int:
+    return int(hashlib.sha256(repr(parts).encode()).hexdigest()[:12], 16)
+
+
+def _page(title: str, body: str, data: Any) -> bytes:
+    # `</` can't appear inside a script tag, escape it in the embedded JSON
+    payload = json.dumps(data).replace("</", "<\\/")
+    return (
+        "<!doctype html><html><head>"
+        f"<title>{html.escape(title)}</title>"
+        f'<script type="application/json" id="fixture-data">{payload}</script>'
+        f"</head><body>{body}</body></html>"
+    ).encode()
+
+
+def fake_value(schema: dict, name: str, seed: int, defs: Optional[dict] = None) -> Any:
+    """Builds a deterministic value that satisfies a (pydantic style) JSON schema."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fake_value(defs[schema["$ref"].split("/")[-1]], name, seed, defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"]
+            return fake_value(options[0] if options else {}, name, seed, defs)
+
+    schema_type = schema.get("type", "string")
+    if schema_type == "object":
+        return {
+            prop: fake_value(sub, prop, _seed(seed, prop), defs)
+            for prop, sub in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        items = schema.get("items", {})
+        return [fake_value(items, name, _seed(seed, i), defs) for i in range(2)]
+    if schema_type == "integer":
+        return seed % 100
+    if schema_type == "number":
+        return (seed % 10_000) / 100
+    if schema_type == "boolean":
+        return seed % 2 == 0
+    return f"{name}-{seed % 1_000_000:06d}"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    config = FixtureConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "text/html"):
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate_page_load(self):
+        jitter = random.Random(_seed(self.path)).uniform(0, self.config.page_jitter)
+        time.sleep(self.config.page_latency + jitter)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        base = f"http://{self.headers.get('Host')}"
+        routes = [
+            (r"/companies", lambda: self._companies(base)),
+            (r"/companies/company-(\d+)", lambda n: self._company(int(n))),
+            (r"/news", lambda: self._news(base)),
+            (r"/item", lambda: self._item(int(query.get("id", ["0"])[0]))),
+            (
+                r"/([\w-]+)/([\w-]+)/stargazers",
+                lambda owner, repo: self._stargazers(
+                    base, owner, repo, int(query.get("page", ["1"])[0])
+                ),
+            ),
+            (r"/users/([\w-]+)", lambda username: self._profile(base, username)),
+        ]
+        for pattern, handler in routes:
+            match = re.fullmatch(pattern, url.path)
+            if match:
+                self._simulate_page_load()
+                body = handler(*match.groups())
+                if body is None:
+                    break
+                return self._send(200, body)
+        self._send(404, _page("Not found", "<h1>Not found</h1>", None))
+
+    def _companies(self, base: str) -> bytes:
+        urls = [
+            f"{base}/companies/company-{i}" for i in range(self.config.num_companies)
+        ]
+        links = "".join(
+            f'<li><a href="{url}">Company {i}</a></li>' for i, url in enumerate(urls)
+        )
+        return _page("Companies", f"<h1>Companies</h1><ul>{links}</ul>", urls)
+
+    def _company(self, n: int) -> Optional[bytes]:
+        if n >= self.config.num_companies:
+            return None
+        rng = random.Random(_seed("company", n))
+        data = {
+            "name": f"Company {n}",
+            "team_size": rng.randint(1, 200),
+            "location": rng.choice(
+                ["San Francisco", "New York", "London", "Stockholm"]
+            ),
+            "website_url": f"https://company-{n}.example.com",
+            "founders": [
+                {
+                    "name": f"Founder {n}-{i}",
+                    "linkedin": f"https://linkedin.com/in/founder-{n}-{i}",
+                    "twitter": None,
+                }
+                for i in range(rng.randint(1, 3))
+            ],
+        }
+        founders = "".join(f"<li>{f['name']}</li>" for f in data["founders"])
+        body = (
+            f"<h1>{data['name']}</h1><p>Team size: {data['team_size']}</p>"
+            f"<p>{data['location']}</p><a href=\"{data['website_url']}\">Website</a>"
+            f"<h2>Founders</h2><ul>{founders}</ul>"
+            + "<p>Lorem ipsum dolor sit amet.</p>" * 50
+        )
+        return _page(data["name"], body, data)
+
+    def _news(self, base: str) -> bytes:
+        posts = []
+        for i in range(self.config.num_posts):
+            rng = random.Random(_seed("post", i))
+            posts.append(
+                {
+                    "rank": i + 1,
+                    "title": f"Show HN: Post number {i}",
+                    "url": f"{base}/item?id={i}",
+                    "points": rng.randint(1, 900),
+                    "comments": rng.randint(0, 400),
+                }
+            )
+        rows = "".join(
+            f"<tr><td>{p['rank']}.</td><td><a href=\"{p['url']}\">{p['title']}</a></td>"
+            f"<td>{p['points']} points</td><td>{p['comments']} comments</td></tr>"
+            for p in posts
+        )
+        return _page("Hacker News", f"<table>{rows}</table>", posts)
+
+    def _item(self, n: int) -> bytes:
+        text = f"This is the text of post {n}. " * 40
+        return _page(f"Post {n}", f"<h1>Post {n}</h1><p>{text}</p>", text)
+
+    def _stargazers(
+        self, base: str, owner: str, repo: str, page: int
+    ) -> Optional[bytes]:
+        per_page = self.config.stargazers_per_page
+        start = (page - 1) * per_page
+        if start >= self.config.num_stargazers and page != 1:
+            return None
+        end = min(start + per_page, self.config.num_stargazers)
+        profile_urls = [f"{base}/users/{owner}-fan-{i}" for i in range(start, end)]
+        next_page_url = (
+            f"{base}/{owner}/{repo}/stargazers?page={page + 1}"
+            if end < self.config.num_stargazers
+            else None
+        )
+        data = {"profile_urls": profile_urls, "next_page_url": next_page_url}
+        links = "".join(f'<li><a href="{url}">{url}</a></li>' for url in profile_urls)
+        if next_page_url:
+            links += f'<a href="{next_page_url}">Next</a>'
+        return _page(f"Stargazers of {owner}/{repo}", f"<ul>{links}</ul>", data)
+
+    def _profile(self, base: str, username: str) -> bytes:
+        rng = random.Random(_seed("user", username))
+        repos = [f"repo-{rng.randint(0, 999)}" for _ in range(rng.randint(0, 6))]
+        data = {
+            "full_name": username.replace("-", " ").title(),
+            "username": username,
+            "bio": rng.choice(["Building web agents", "Data engineer", ""]),
+            "repos": repos,
+        }
+        nav = "<nav>" + "<a href='/'>Product</a>" * 40 + "</nav>"
+        pinned = "".join(
+            f"<li><a href='{base}/users/{username}/{r}'>{r}</a> Python</li>"
+            for r in repos
+        )
+        graph = "<table>" + "<tr>" + "<td></td>" * 53 + "</tr>" * 7 + "</table>"
+        body = (
+            f"{nav}<img src='https://avatars.example.com/{username}.png'>"
+            f"<h1>{data['full_name']}</h1><p>{data['bio']}</p>"
+            f"<h2>Pinned</h2><ul>{pinned}</ul>{graph}<footer>© 2024 GitHub</footer>"
+        )
+        return _page(username, body, data)
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip("/") != "/v1/chat/completions":
+            return self._send(404, b"{}", "application/json")
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self._send(
+            200, json.dumps(self._completion(request)).encode(), "application/json"
+        )
+
+    def _completion(self, request: dict) -> dict:
+        messages = request.get("messages", [])
+        prompt = "".join(str(m.get("content", "")) for m in messages)
+        prompt_tokens = len(prompt) // 4
+        time.sleep(
+            self.config.llm_latency
+            + prompt_tokens / 1000 * self.config.llm_latency_per_1k_tokens
+        )
+
+        seed = _seed(request.get("model"), prompt)
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format["json_schema"]["schema"]
+            content = json.dumps(fake_value(schema, "value", seed))
+        else:
+            content = f"Fake answer {seed % 1_000_000:06d} for a {prompt_tokens} token prompt."
+
+        return {
+            "id": f"chatcmpl-fake-{seed % 1_000_000}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+
+
+def start_server(
+    config: FixtureConfig, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    """Starts the fixture server in a daemon thread, port 0 picks a free port."""
+    handler = type("ConfiguredFixtureHandler", (FixtureHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve benchmark fixtures locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--page-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    server = start_server(
+        FixtureConfig(
+            page_latency=args.page_latency_ms / 1000,
+            llm_latency=args.llm_latency_ms / 1000,
+        ),
+        port=args.port,
+    )
+    print(f"Serving fixtures on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
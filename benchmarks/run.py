@@ -0,0 +1,323 @@
+# Offline benchmark for the crawling pipelines. Runs them against the local fixture
+# server and fake LLM at several concurrency levels and reports throughput, item
+# latency percentiles and peak memory, so changes can be compared run to run.
+#
+#   python benchmarks/run.py                                  # every scenario
+#   python benchmarks/run.py --scenario yc --concurrency 1 10 20
+#   python benchmarks/run.py --page-latency-ms 500 --llm-latency-ms 1500 --json
+#   python benchmarks/run.py --adaptive                      # concurrency is the max
+#   python benchmarks/run.py --scenario yc --shards 4         # 4 processes, 4 browsers
+#
+# Scenarios:
+#   yc          crawlers/yc_companies/crawl_yc_companies.extract_companies
+#   stargazers  agents/openai_github_startgazers_analyser GetStargazersTool.collect
+#
+# With --shards the yc companies are crawled by that many processes with a browser
+# and limiter each, concurrency is per shard.
+#
+# Each run happens in its own subprocess and temporary working directory, so peak
+# RSS is per run and caches written by the pipelines don't leak between runs. For
+# a sharded run it's the peak of its largest process, and the limit is the sum of
+# the shards' final limits.
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCHMARKS_DIR.parent
+
+sys.path.insert(0, str(BENCHMARKS_DIR))
+sys.path.insert(0, str(REPO_ROOT))
+
+from fake_browser import FixtureBrowser, LatencyRecorder  # noqa: E402
+from fixture_server import FixtureConfig, start_server  # noqa: E402
+
+SCENARIOS = {
+    "yc": {
+        "path": REPO_ROOT / "crawlers" / "yc_companies",
+        "items": r"/companies/company-\d+$",
+    },
+    "stargazers": {
+        "path": REPO_ROOT / "agents" / "openai_github_startgazers_analyser",
+        "items": r"/users/[\w-]+$",
+    },
+}
+
+
+def percentile(values: list[float], p: float) -> float:
+    # Nearest-rank percentile, 0 for an empty run
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    import resource
+
+    # The shard processes count as well, once they've been joined
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def make_limiter(concurrency: int, adaptive: bool):
+    from shared.adaptive_limiter import AdaptiveLimiter
+
+    if adaptive:
+        return AdaptiveLimiter(initial=1, min_limit=1, max_limit=concurrency)
+    return AdaptiveLimiter(
+        initial=concurrency, min_limit=concurrency, max_limit=concurrency
+    )
+
+
+async def run_yc(browser: FixtureBrowser, limiter) -> int:
+    import crawl_yc_companies
+
+    await browser.goto(f"{browser.base_url}/companies")
+    urls = await browser.extract(
+        "The URLs of each listed startup. Return this format: list[str]"
+    )
+    return await crawl_yc_companies.extract_companies(
+        browser, urls, limiter=limiter  # type: ignore
+    )
+
+
+async def run_stargazers(browser: FixtureBrowser, limiter) -> int:
+    from stargazer_agent import GetStargazersTool
+
+    count, _ = await GetStargazersTool.collect(
+        browser,  # type: ignore
+        f"{browser.base_url}/dendrite-systems/dendrite-python-sdk/stargazers",
+        limiter=limiter,
+    )
+    return count
+
+
+RUNNERS = {"yc": run_yc, "stargazers": run_stargazers}
+
+
+async def crawl_yc_shard(
+    urls: list[str], journal, base_url: str, concurrency: int, adaptive: bool
+) -> tuple[list[float], int]:
+    # Runs in each shard process, returns the latencies it recorded and the final
+    # limit of its limiter
+    import crawl_yc_companies
+
+    recorder = LatencyRecorder(SCENARIOS["yc"]["items"])
+    limiter = make_limiter(concurrency, adaptive)
+    async with FixtureBrowser(base_url, recorder) as browser:
+        await crawl_yc_companies.extract_companies(
+            browser,  # type: ignore
+            urls,
+            limiter=limiter,
+            journal=journal,
+        )
+    return recorder.latencies, limiter.limit
+
+
+async def run_yc_sharded(
+    browser: FixtureBrowser,
+    recorder: LatencyRecorder,
+    concurrency: int,
+    adaptive: bool,
+    shards: int,
+) -> tuple[int, int]:
+    # Returns the number of items and the sum of the shards' final limits
+    from sharding import DONE, FINISHED, crawl_sharded
+
+    await browser.goto(f"{browser.base_url}/companies")
+    urls = await browser.extract(
+        "The URLs of each listed startup. Return this format: list[str]"
+    )
+    items = 0
+    final_limit = 0
+    args = (browser.base_url, concurrency, adaptive)
+    async for event in crawl_sharded(crawl_yc_shard, urls, shards, args=args):
+        if event.kind == DONE:
+            items += 1
+        elif event.kind == FINISHED:
+            if event.error is not None:
+                raise RuntimeError(f"Shard {event.shard} failed: {event.error}")
+            latencies, limit = event.result
+            recorder.latencies.extend(latencies)
+            final_limit += limit
+    return items, final_limit
+
+
+async def run_worker(
+    scenario: str, base_url: str, concurrency: int, adaptive: bool, shards: int = 1
+) -> dict:
+    sys.path.insert(0, str(SCENARIOS[scenario]["path"]))
+    recorder = LatencyRecorder(SCENARIOS[scenario]["items"])
+    limiter = make_limiter(concurrency, adaptive)
+
+    async with FixtureBrowser(base_url, recorder) as browser:
+        start = time.perf_counter()
+        if shards > 1:
+            # The parent's limiter isn't used, each shard has its own
+            items, final_limit = await run_yc_sharded(
+                browser, recorder, concurrency, adaptive, shards
+            )
+        else:
+            items = await RUNNERS[scenario](browser, limiter)
+            final_limit = limiter.limit
+        elapsed = time.perf_counter() - start
+
+    latencies = recorder.latencies
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "shards": shards,
+        "adaptive": adaptive,
+        "final_limit": final_limit,
+        "items": items,
+        "seconds": elapsed,
+        "items_per_sec": items / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_in_subprocess(
+    scenario: str, base_url: str, concurrency: int, adaptive: bool, shards: int = 1
+) -> dict:
+    env = {
+        **os.environ,
+        # Anything that talks to OpenAI directly goes to the fake LLM as well
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "OPENAI_API_KEY": "fake-key",
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(Path(__file__).resolve()),
+                "--worker",
+                "--scenario",
+                scenario,
+                "--base-url",
+                base_url,
+                "--concurrency",
+                str(concurrency),
+                "--shards",
+                str(shards),
+                *(["--adaptive"] if adaptive else []),
+            ],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"{scenario} at concurrency {concurrency} failed:\n{result.stderr}"
+        )
+    # The pipelines print as they go, the metrics are the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_table(rows: list[dict]):
+    header = (
+        f"{'scenario':<12}{'shards':>7}{'conc':>6}{'limit':>7}{'items':>7}{'secs':>8}{'items/s':>9}"
+        f"{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'rss MB':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['scenario']:<12}{row['shards']:>7}{row['concurrency']:>6}"
+            f"{row['final_limit']:>7}"
+            f"{row['items']:>7}"
+            f"{row['seconds']:>8.2f}{row['items_per_sec']:>9.2f}"
+            f"{row['p50']:>8.2f}{row['p95']:>8.2f}{row['p99']:>8.2f}"
+            f"{row['peak_rss_mb']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the crawling pipelines against local fixtures"
+    )
+    parser.add_argument(
+        "--scenario", choices=list(SCENARIOS), nargs="+", default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--items", type=int, default=100, help="Pages per scenario")
+    parser.add_argument("--page-latency-ms", type=float, default=200)
+    parser.add_argument("--page-jitter-ms", type=float, default=100)
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Let the limiter adapt, with each concurrency level as its maximum",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Crawl the yc scenario in this many processes, concurrency is per shard",
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON lines instead")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        metrics = asyncio.run(
+            run_worker(
+                args.scenario[0],
+                args.base_url,
+                args.concurrency[0],
+                args.adaptive,
+                args.shards,
+            )
+        )
+        print(json.dumps(metrics))
+        return
+
+    server = start_server(
+        FixtureConfig(
+            num_companies=args.items,
+            num_stargazers=args.items,
+            page_latency=args.page_latency_ms / 1000,
+            page_jitter=args.page_jitter_ms / 1000,
+            llm_latency=args.llm_latency_ms / 1000,
+        )
+    )
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    rows = []
+    try:
+        for scenario in args.scenario:
+            # Only the yc crawl can be sharded
+            shards = args.shards if scenario == "yc" else 1
+            for concurrency in args.concurrency:
+                row = run_in_subprocess(
+                    scenario, base_url, concurrency, args.adaptive, shards
+                )
+                rows.append(row)
+                if args.json:
+                    print(json.dumps(row), flush=True)
+    finally:
+        server.shutdown()
+
+    if not args.json:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
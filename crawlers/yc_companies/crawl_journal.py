@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+
+class CrawlJournal:
+    """
+    SQLite-backed record of a crawl with one row per URL: its status, how many
+    times it has been attempted, and its result or last error.
+
+    Every status change is committed on its own as soon as it happens, so when the
+    process dies the journal still knows which URLs are done and their results.
+    A resumed crawl only needs to run what's left.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: each statement is its own atomic transaction
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "url TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "result TEXT, error TEXT, updated_at REAL NOT NULL)"
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def add(self, urls: Iterable[str]):
+        """Adds URLs as pending, URLs already in the journal keep their status."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, status, updated_at) VALUES (?, ?, ?)",
+                [(url, PENDING, now) for url in urls],
+            )
+            self._conn.execute("COMMIT")
+
+    def start(self, url: str):
+        self._execute(
+            "UPDATE urls SET status = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE url = ?",
+            (IN_FLIGHT, time.time(), url),
+        )
+
+    def finish(self, url: str, result: dict):
+        self._execute(
+            "UPDATE urls SET status = ?, result = ?, error = NULL, updated_at = ? "
+            "WHERE url = ?",
+            (DONE, json.dumps(result), time.time(), url),
+        )
+
+    def fail(self, url: str, error: str):
+        self._execute(
+            "UPDATE urls SET status = ?, error = ?, updated_at = ? WHERE url = ?",
+            (FAILED, error, time.time(), url),
+        )
+
+    def recover(self) -> int:
+        """
+        Puts URLs left in flight by a crashed run back to pending, returns how many.
+        Only call this when no other process is crawling with the same journal.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE urls SET status = ?, updated_at = ? WHERE status = ?",
+                (PENDING, time.time(), IN_FLIGHT),
+            ).rowcount
+
+    def remaining(self, max_attempts: Optional[int] = None) -> list[str]:
+        """Pending URLs, plus failed ones that haven't used up `max_attempts`."""
+        rows = self._execute(
+            "SELECT url FROM urls WHERE status = ? "
+            "OR (status = ? AND (? IS NULL OR attempts < ?)) ORDER BY rowid",
+            (PENDING, FAILED, max_attempts, max_attempts),
+        )
+        return [url for (url,) in rows]
+
+    def results(self) -> dict[str, dict]:
+        rows = self._execute(
+            "SELECT url, result FROM urls WHERE status = ? ORDER BY rowid", (DONE,)
+        )
+        return {url: json.loads(result) for url, result in rows}
+
+    def counts(self) -> dict[str, int]:
+        rows = self._execute("SELECT status, COUNT(*) FROM urls GROUP BY status")
+        return {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0, **dict(rows)}
+
+    def reset(self):
+        """Forgets every URL, for starting a new crawl with the same journal file."""
+        self._execute("DELETE FROM urls")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
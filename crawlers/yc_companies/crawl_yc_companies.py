@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from pydantic import BaseModel
+from dendrite import AsyncDendrite
+from dotenv import load_dotenv
+
+# The helpers shared between the examples are in `shared/` at the root of the repo
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from crawl_journal import CrawlJournal  # noqa: E402
+from sharding import (  # noqa: E402
+    DONE,
+    FAILED,
+    FINISHED,
+    STARTED,
+    ShardJournal,
+    crawl_sharded,
+)
+from shared.adaptive_limiter import AdaptiveLimiter  # noqa: E402
+from shared.streaming import Sink, open_sink, stream_completed  # noqa: E402
+from shared.tab_pool import AsyncTabPool  # noqa: E402
+from shared.tracing import (  # noqa: E402
+    TRACER,
+    JSONTraceExporter,
+    serve_metrics,
+    traced,
+)
+
+load_dotenv()
+
+# Bounds for the number of companies extracted at once, the limiter settles on a
+# level in between depending on how fast and reliably the site responds
+MIN_CONCURRENCY = 2
+MAX_CONCURRENCY = 30
+
+# Progress and results of the crawl, so an interrupted crawl can be resumed
+JOURNAL_FILE = Path("crawl") / "yc_companies.sqlite3"
+# Failed URLs are retried on --resume until they have been tried this many times
+MAX_ATTEMPTS = 3
+# Companies are written here as they are extracted, .ndjson, .csv or .sqlite3
+OUTPUT_FILE = Path("crawl") / "yc_companies.ndjson"
+
+
+# Define Pydantic Models for data extraction
+class Founder(BaseModel):
+    name: str
+    linkedin: str | None
+    twitter: str | None
+
+
+class Company(BaseModel):
+    name: str
+    team_size: int
+    location: str
+    website_url: str
+    founders: list[Founder]
+
+
+# Extract company info from tab
+async def extract_info(
+    pool: AsyncTabPool,
+    limiter: AdaptiveLimiter,
+    url,
+    journal: CrawlJournal | None = None,
+):
+    # Wait for the limiter, then borrow a warm tab from the pool, navigate it to the
+    # URL and extract company info. Timeouts and slow pages lower the limit.
+    with TRACER.span("company", root=True, url=url):
+        async with limiter.slot():
+            if journal is not None:
+                journal.start(url)
+            async with pool.tab(url) as tab:
+                company = await tab.extract("The company info ", type_spec=Company)
+    # Dendrite returns None when the extraction fails, which has to count as a
+    # failed URL rather than an extracted company
+    if company is None:
+        raise ValueError(f"Could not extract the company info from {url}")
+    return company
+
+
+# Go to each URL concurrently and extract company info, with an adaptive number of
+# tabs in use at once. Tabs are recycled after 25 pages each. Companies go to `sink`
+# as they come in, returns how many were extracted.
+async def extract_companies(
+    browser: AsyncDendrite,
+    urls,
+    sink: Sink | None = None,
+    limiter: AdaptiveLimiter | None = None,
+    journal: CrawlJournal | None = None,
+) -> int:
+    if limiter is None:
+        limiter = AdaptiveLimiter(
+            initial=MIN_CONCURRENCY,
+            min_limit=MIN_CONCURRENCY,
+            max_limit=MAX_CONCURRENCY,
+        )
+    browser = traced(browser)
+    extracted = 0
+    with TRACER.recording() as timings:
+        async with AsyncTabPool(browser, size=limiter.max_limit, max_uses=25) as pool:
+            # Tasks are only created as tabs free up and nothing is kept once written,
+            # so memory stays flat however many URLs there are. With a journal a failed
+            # URL is recorded for a later retry instead of failing the whole crawl.
+            results = stream_completed(
+                urls,
+                lambda url: extract_info(pool, limiter, url, journal),
+                max_pending=limiter.max_limit,
+                return_exceptions=journal is not None,
+            )
+            async for url, result in results:
+                if isinstance(result, BaseException):
+                    print(f"Failed to extract {url}: {result}")
+                    journal.fail(url, repr(result))  # type: ignore
+                    continue
+
+                extracted += 1
+                if sink is not None:
+                    sink.write(result)
+                # Only marked done once written, so a crash in between redoes the URL
+                if journal is not None:
+                    journal.finish(url, result.model_dump())
+
+    print(f"Concurrency limiter: {limiter.metrics()}")
+    print(f"Time spent per call:\n{timings.table()}")
+    return extracted
+
+
+# Runs in each shard process, with a browser and limiter of its own
+async def crawl_shard(urls: list[str], journal: ShardJournal) -> int:
+    async with AsyncDendrite() as browser:
+        return await extract_companies(browser, urls, journal=journal)
+
+
+# Splits the URLs over `shards` processes, each with its own browser, and merges
+# what they extract into `sink` and `journal` from this process
+async def extract_companies_sharded(
+    urls: list[str],
+    shards: int,
+    sink: Sink | None = None,
+    journal: CrawlJournal | None = None,
+) -> int:
+    extracted = 0
+    async for event in crawl_sharded(crawl_shard, urls, shards):
+        if event.kind == STARTED and journal is not None:
+            journal.start(event.url)  # type: ignore
+        elif event.kind == DONE:
+            extracted += 1
+            if sink is not None:
+                sink.write(event.result)
+            if journal is not None:
+                journal.finish(event.url, event.result)  # type: ignore
+        elif event.kind == FAILED and journal is not None:
+            journal.fail(event.url, event.error)  # type: ignore
+        elif event.kind == FINISHED and event.error is not None:
+            # Its URLs that were in flight are retried on --resume
+            print(f"Shard {event.shard} crashed: {event.error}")
+    return extracted
+
+
+# Main function (asynchronous)
+async def main(
+    resume: bool = False,
+    max_attempts: int = MAX_ATTEMPTS,
+    outputs: tuple[Path, ...] = (OUTPUT_FILE,),
+    trace_file: Path | None = None,
+    metrics_port: int | None = None,
+    shards: int = 1,
+):
+    journal = CrawlJournal(JOURNAL_FILE)
+    if trace_file is not None:
+        TRACER.add_exporter(JSONTraceExporter(trace_file))
+    if metrics_port is not None:
+        serve_metrics(metrics_port)
+
+    # Initiate async Dendrite browser, every call on it is timed
+    browser = traced(AsyncDendrite())
+
+    if resume:
+        # Skip the search, the URLs are in the journal already. URLs that were in
+        # flight when the last run died are crawled again.
+        requeued = journal.recover()
+        print(
+            f"Resuming crawl {journal.counts()}, {requeued} interrupted URLs requeued"
+        )
+    else:
+        journal.reset()
+
+        # Go to YC and search for AI agent companies
+        await browser.goto("https://ycombinator.com/companies")
+        await browser.fill("Search field", value="AI agent")
+
+        # Extract the urls of the resulting list
+        urls = await browser.extract(
+            "The URLs of each listed startup. Return this format: list[str]"
+        )
+        journal.add(urls)
+
+    # Go to each URL concurrently in different tabs and extract company info, a
+    # resumed crawl adds to the output of the runs before it
+    with open_sink(*outputs, append=resume) as sink:
+        urls = journal.remaining(max_attempts)
+        if shards > 1:
+            await extract_companies_sharded(urls, shards, sink=sink, journal=journal)
+        else:
+            await extract_companies(browser, urls, sink=sink, journal=journal)
+    print(f"Crawl finished {journal.counts()}")
+
+    # Do something with the extracted company info
+    print(f"Companies written to {', '.join(str(path) for path in outputs)}")
+    journal.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract YC AI agent companies")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last crawl, skipping done URLs and retrying failed ones",
+    )
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        nargs="+",
+        default=[OUTPUT_FILE],
+        help="Where to write companies to: .ndjson, .csv and/or .sqlite3 files",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        help="Write a trace of every browser call, opens in https://ui.perfetto.dev",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve latency histograms for Prometheus at :PORT/metrics",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Crawl in this many processes with a browser each, e.g. one per core",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            resume=args.resume,
+            max_attempts=args.max_attempts,
+            outputs=tuple(args.output),
+            trace_file=args.trace,
+            metrics_port=args.metrics_port,
+            shards=args.shards,
+        )
+    )
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import multiprocessing
+import queue
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+# Sent once by every shard when it stops, with what `crawl` returned or the error
+# if it crashed
+FINISHED = "finished"
+
+# Seconds between two progress lines while shards are running
+PROGRESS_INTERVAL = 5.0
+
+
+def shard_of(key: str, shards: int) -> int:
+    # Stable across processes and runs, unlike `hash()`, so a resumed crawl puts
+    # every URL on the same shard again
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def partition(keys: list[str], shards: int) -> list[list[str]]:
+    parts: list[list[str]] = [[] for _ in range(shards)]
+    for key in keys:
+        parts[shard_of(key, shards)].append(key)
+    return parts
+
+
+@dataclass
+class ShardEvent:
+    shard: int
+    kind: str
+    url: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+
+
+class ShardJournal:
+    """
+    Stands in for a `CrawlJournal` inside a shard process and sends every status
+    change to the parent, which keeps the one real journal and output.
+    """
+
+    def __init__(self, shard: int, events: Any):
+        self.shard = shard
+        self._events = events
+
+    def start(self, url: str):
+        self._events.put(ShardEvent(self.shard, STARTED, url))
+
+    def finish(self, url: str, result: dict):
+        self._events.put(ShardEvent(self.shard, DONE, url, result=result))
+
+    def fail(self, url: str, error: str):
+        self._events.put(ShardEvent(self.shard, FAILED, url, error=error))
+
+
+@dataclass
+class ShardProgress:
+    total: list[int]
+    done: list[int] = field(default_factory=list)
+    failed: list[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.done = [0] * len(self.total)
+        self.failed = [0] * len(self.total)
+
+    def update(self, event: ShardEvent):
+        if event.kind == DONE:
+            self.done[event.shard] += 1
+        elif event.kind == FAILED:
+            self.failed[event.shard] += 1
+
+    def __str__(self) -> str:
+        return ", ".join(
+            f"shard {shard}: {self.done[shard]}/{total}"
+            + (f" ({self.failed[shard]} failed)" if self.failed[shard] else "")
+            for shard, total in enumerate(self.total)
+        )
+
+
+def _run_shard(
+    crawl: Callable[..., Awaitable[Any]],
+    shard: int,
+    urls: list[str],
+    events: Any,
+    args: tuple,
+):
+    result, error = None, None
+    try:
+        result = asyncio.run(crawl(urls, ShardJournal(shard, events), *args))
+    except BaseException as e:
+        error = repr(e)
+    events.put(ShardEvent(shard, FINISHED, result=result, error=error))
+
+
+def _drain(events: Any) -> list[ShardEvent]:
+    # Everything already in the queue, without waiting for more
+    drained = []
+    while True:
+        try:
+            drained.append(events.get_nowait())
+        except queue.Empty:
+            return drained
+
+
+async def crawl_sharded(
+    crawl: Callable[..., Awaitable[Any]],
+    urls: list[str],
+    shards: int,
+    args: tuple = (),
+) -> AsyncIterator[ShardEvent]:
+    """
+    Splits `urls` into `shards` by a stable hash and crawls each part in its own
+    process with `crawl(urls, journal, *args)`, which must be a module level
+    coroutine function that launches its own browser.
+
+    Yields what the shards report to their journal as it happens, so results from
+    every process end up in one stream. `crawl` and `args` are pickled, and the
+    processes are spawned rather than forked so none of them inherit the parent's
+    event loop or browser.
+    """
+    parts = partition(urls, shards)
+    progress = ShardProgress([len(part) for part in parts])
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    processes = {
+        shard: context.Process(
+            target=_run_shard,
+            args=(crawl, shard, part, events, args),
+            name=f"crawl-shard-{shard}",
+            daemon=True,
+        )
+        for shard, part in enumerate(parts)
+        if part
+    }
+    for process in processes.values():
+        process.start()
+
+    loop = asyncio.get_running_loop()
+    last_report = time.monotonic()
+    try:
+        while processes:
+            dead = []
+            try:
+                received = [await loop.run_in_executor(None, events.get, True, 1.0)]
+            except queue.Empty:
+                dead = [shard for shard, p in processes.items() if not p.is_alive()]
+                # A shard's last events can still be queued after it exited, they
+                # have to be read before it counts as killed
+                received = _drain(events) if dead else []
+
+            for event in received:
+                progress.update(event)
+                if event.kind == FINISHED:
+                    process = processes.pop(event.shard, None)
+                    if process is not None:
+                        process.join()
+                yield event
+
+            # A shard that was killed never says it finished
+            for shard in dead:
+                process = processes.pop(shard, None)
+                if process is not None:
+                    yield ShardEvent(
+                        shard, FINISHED, error=f"Exit code {process.exitcode}"
+                    )
+
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                print(f"Progress: {progress}")
+                last_report = time.monotonic()
+    finally:
+        for process in processes.values():
+            process.terminate()
+            process.join()
+        events.close()
+    print(f"Progress: {progress}")
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+# How fast the latency baseline follows latencies above it, per successful job
+BASELINE_DRIFT = 0.01
+
+
+class AdaptiveLimiter:
+    """
+    A concurrency limit that finds its own level, like TCP congestion control (AIMD).
+
+    Every successful job raises the limit by `increase / limit`, so roughly one more
+    slot per round of jobs. A failed job, or a job whose latency grows past
+    `latency_tolerance` times the fastest latency seen so far, multiplies the limit
+    by `backoff`. Jobs that were already running at the last cut don't cut again,
+    so one burst of timeouts only backs off once. The limit stays within
+    `min_limit` and `max_limit`.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("Expected 1 <= min_limit <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self.in_flight = 0
+        self.waiting = 0
+        self.successes = 0
+        self.failures = 0
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._changed: Optional[asyncio.Condition] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def metrics(self) -> dict:
+        """Current limit, queue depth and latency estimates, for logging or dashboards."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "successes": self.successes,
+            "failures": self.failures,
+            "latency": self._latency,
+            "baseline_latency": self._baseline,
+        }
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Waits for a free slot, and adjusts the limit by how the job went."""
+        started = await self._acquire()
+        try:
+            yield
+        except Exception:
+            await self._release(started, failed=True)
+            raise
+        except BaseException:
+            # Cancellation says nothing about the site, give the slot back as is
+            await self._release(started, failed=None)
+            raise
+        else:
+            await self._release(started, failed=False)
+
+    async def _acquire(self) -> float:
+        # Created lazily so the limiter can be built outside of a running loop
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        async with self._changed:
+            self.waiting += 1
+            try:
+                await self._changed.wait_for(lambda: self.in_flight < self.limit)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def _release(self, started: float, failed: Optional[bool]):
+        assert self._changed is not None
+        async with self._changed:
+            self.in_flight -= 1
+            if failed is not None:
+                self._adjust(started, failed)
+            self._changed.notify_all()
+
+    def _adjust(self, started: float, failed: bool):
+        elapsed = time.monotonic() - started
+        if failed:
+            self.failures += 1
+        else:
+            self.successes += 1
+            if self._latency is None:
+                self._latency = elapsed
+            else:
+                self._latency += self.smoothing * (elapsed - self._latency)
+            if self._baseline is None or self._latency < self._baseline:
+                self._baseline = self._latency
+            else:
+                # Creep up slowly so a site that got slower for good isn't mistaken
+                # for congestion forever
+                self._baseline += BASELINE_DRIFT * (self._latency - self._baseline)
+
+        threshold = (self._baseline or 0) * self.latency_tolerance
+        # Both the smoothed latency and this job must be slow, the average alone
+        # lags behind and would keep cutting after the queue has drained
+        congested = failed or (
+            self._baseline is not None
+            and elapsed > threshold
+            and self._latency is not None
+            and self._latency > threshold
+        )
+        if not congested:
+            self._limit = min(self.max_limit, self._limit + self.increase / self._limit)
+        elif started >= self._last_decrease:
+            self._limit = max(self.min_limit, self._limit * self.backoff)
+            self._last_decrease = time.monotonic()
@@ -0,0 +1,59 @@
+import asyncio
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """
+    Owns one long-lived asyncio event loop running in a daemon thread.
+
+    Streamlit runs the script in a fresh thread on every interaction, so calling
+    `asyncio.run` per chat turn creates and destroys a loop each time and nothing
+    async (browsers, HTTP clients, caches) can outlive a turn. Submitting the turns
+    to this loop instead keeps those objects alive for the whole server process.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._shutdown_hooks: list[Callable[[], Coroutine[Any, Any, Any]]] = []
+        self._thread = threading.Thread(
+            target=self._run, name="agent-event-loop", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        """Schedules `coro` on the background loop and returns a thread-safe future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Runs `coro` on the background loop and waits for its result."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def on_shutdown(self, hook: Callable[[], Coroutine[Any, Any, Any]]):
+        """Registers a coroutine function that cleans up before the loop stops."""
+        self._shutdown_hooks.append(hook)
+
+    def stop(self, timeout: float = 30):
+        if not self.loop.is_running():
+            return
+        for hook in self._shutdown_hooks:
+            try:
+                self.run(hook(), timeout=timeout)
+            except Exception as e:
+                print(f"Shutdown hook failed: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
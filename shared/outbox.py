@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from dendrite import AsyncDendrite, AsyncPage
+
+from shared.selector_cache import click, fill
+
+OUTLOOK_AUTH = "outlook.live.com"
+OUTLOOK_URL = "https://outlook.live.com/mail/0/"
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# The send button was clicked but didn't finish, the email may or may not be out
+UNCONFIRMED = "unconfirmed"
+# Statuses an email doesn't leave on its own
+FINAL = (SENT, FAILED, UNCONFIRMED)
+
+# Seconds between two emails, so a batch of outreach doesn't look like spam
+MIN_SEND_INTERVAL = 10.0
+# Attempts per email, and the delay before the first retry which doubles after that
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 15.0
+
+
+def message_id(to_address: str, subject: str, body: str) -> str:
+    # The same email always gets the same id, so queueing it twice sends it once
+    encoded = json.dumps([to_address.strip().lower(), subject, body])
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+@dataclass
+class OutgoingEmail:
+    id: str
+    to_address: str
+    subject: str
+    status: str
+    attempts: int
+    error: Optional[str]
+
+    def describe(self) -> str:
+        text = f"Email {self.id} to {self.to_address} ({self.subject}): {self.status}"
+        if self.status == QUEUED and self.attempts:
+            text += f", will retry after {self.attempts} failed attempts"
+        if self.error:
+            text += f", last error: {self.error}"
+        return text
+
+
+class Outbox:
+    """
+    Queues emails in a local SQLite file and sends them one at a time from a
+    single Outlook tab that stays open and logged in between emails.
+
+    Sends are at least MIN_SEND_INTERVAL seconds apart. An attempt that fails
+    while composing is retried with backoff, but once the send button has been
+    clicked an email is never retried, so a retry can't send it twice. Such an
+    email, or one that was being sent when the process died, is marked
+    unconfirmed instead, and is left for the user to check.
+
+    `get_client` returns the browser to send from, by default the outbox launches
+    its own and closes it in `close()`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        get_client: Optional[Callable[[], Awaitable[AsyncDendrite]]] = None,
+        min_interval: float = MIN_SEND_INTERVAL,
+        max_attempts: int = MAX_ATTEMPTS,
+    ):
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self._get_client = get_client
+        self._client: Optional[AsyncDendrite] = None
+        self._tab: Optional[AsyncPage] = None
+        self._tab_needs_reset = False
+        self._last_sent = 0.0
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: each statement is its own atomic transaction
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id TEXT PRIMARY KEY, to_address TEXT NOT NULL, subject TEXT NOT NULL, "
+            "body TEXT NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "next_attempt_at REAL NOT NULL, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._execute(
+            "UPDATE outbox SET status = ?, error = ?, updated_at = ? WHERE status = ?",
+            (UNCONFIRMED, "Interrupted while sending", time.time(), SENDING),
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _set_status(self, id: str, status: str, error: Optional[str] = None):
+        self._execute(
+            "UPDATE outbox SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, error, time.time(), id),
+        )
+
+    def get(self, id: str) -> Optional[OutgoingEmail]:
+        rows = self._execute(
+            "SELECT id, to_address, subject, status, attempts, error FROM outbox "
+            "WHERE id = ?",
+            (id,),
+        )
+        return OutgoingEmail(*rows[0]) if rows else None
+
+    def recent(self, limit: int = 50) -> list[OutgoingEmail]:
+        rows = self._execute(
+            "SELECT id, to_address, subject, status, attempts, error FROM outbox "
+            "ORDER BY updated_at DESC LIMIT ?",
+            (limit,),
+        )
+        return [OutgoingEmail(*row) for row in rows]
+
+    def enqueue(self, to_address: str, subject: str, body: str) -> str:
+        """
+        Queues an email and returns its id. An email that was queued, sent or is
+        unconfirmed keeps its status, a failed one is queued again.
+        """
+        id = message_id(to_address, subject, body)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (id, to_address, subject, body, "
+                "status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (id, to_address, subject, body, QUEUED, now, now, now),
+            )
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = 0, error = NULL, "
+                "next_attempt_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, now, now, id, FAILED),
+            )
+        self._start()
+        return id
+
+    async def send(
+        self, to_address: str, subject: str, body: str, timeout: Optional[float] = None
+    ) -> OutgoingEmail:
+        """
+        Queues an email and waits until it's sent or has failed for good, or for
+        `timeout` seconds after which it stays queued. Returns its status.
+        """
+        id = self.enqueue(to_address, subject, body)
+        email = self.get(id)
+        if email is not None and email.status in FINAL:
+            return email
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(id, []).append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(id, [])
+            if future in waiters:
+                waiters.remove(future)
+        return self.get(id)  # type: ignore
+
+    async def start(self):
+        """Starts sending whatever is still queued from earlier runs."""
+        self._start()
+
+    def _start(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    def _next_due(self) -> tuple[Optional[tuple], Optional[float]]:
+        # The oldest email that's due now, or else when the next one will be
+        rows = self._execute(
+            "SELECT id, to_address, subject, body, attempts, next_attempt_at "
+            "FROM outbox WHERE status = ? ORDER BY next_attempt_at, created_at "
+            "LIMIT 1",
+            (QUEUED,),
+        )
+        if not rows:
+            return None, None
+        delay = rows[0][5] - time.time()
+        return (rows[0], None) if delay <= 0 else (None, delay)
+
+    async def _run(self):
+        assert self._wakeup is not None
+        while True:
+            row, delay = self._next_due()
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            id, to_address, subject, body, attempts, _ = row
+            wait = self._last_sent + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            attempts += 1
+            self._execute(
+                "UPDATE outbox SET attempts = ?, updated_at = ? WHERE id = ?",
+                (attempts, time.time(), id),
+            )
+            try:
+                await self._deliver(id, to_address, subject, body)
+                self._set_status(id, SENT)
+                print(f"Sent email {id} to {to_address}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed(id, attempts, e)
+            finally:
+                self._last_sent = time.monotonic()
+            self._notify(id)
+
+    def _failed(self, id: str, attempts: int, error: Exception):
+        # A tab in an unknown state is reloaded before the next email
+        self._tab_needs_reset = True
+        email = self.get(id)
+        if email is not None and email.status == SENDING:
+            self._set_status(id, UNCONFIRMED, repr(error))
+        elif attempts >= self.max_attempts:
+            self._set_status(id, FAILED, repr(error))
+        else:
+            retry_in = RETRY_DELAY * 2 ** (attempts - 1)
+            self._execute(
+                "UPDATE outbox SET status = ?, error = ?, next_attempt_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (QUEUED, repr(error), time.time() + retry_in, time.time(), id),
+            )
+        print(f"Failed to send email {id}, attempt {attempts}: {error}")
+
+    def _notify(self, id: str):
+        email = self.get(id)
+        if email is None or email.status not in FINAL:
+            return
+        for future in self._waiters.pop(id, []):
+            if not future.done():
+                future.set_result(email)
+
+    async def _outlook_tab(self) -> AsyncPage:
+        if self._tab is not None and not self._tab.playwright_page.is_closed():
+            if self._tab_needs_reset:
+                await self._tab.goto(OUTLOOK_URL)
+                self._tab_needs_reset = False
+            return self._tab
+
+        if self._get_client is not None:
+            client = await self._get_client()
+        else:
+            if self._client is None or self._client.closed:
+                self._client = AsyncDendrite(auth=OUTLOOK_AUTH)
+            client = self._client
+        self._tab = await client.new_tab(OUTLOOK_URL)
+        self._tab_needs_reset = False
+        return self._tab
+
+    async def _deliver(self, id: str, to_address: str, subject: str, body: str):
+        tab = await self._outlook_tab()
+        await click(tab, "The new email button")
+        await fill(tab, "to_field", to_address)
+        await tab.press("Enter")
+        await fill(tab, "subject_field", subject)
+        await fill(tab, "body_field", body)
+        # Past this point the email may be out, so it's never retried
+        self._set_status(id, SENDING)
+        await click(tab, "The send button")
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        if self._tab is not None:
+            try:
+                await self._tab.close()
+            except Exception as e:
+                print(f"Failed to close the Outlook tab: {e}")
+        if self._client is not None:
+            # Uploads the authenticated session state
+            await self._client.close()
+        with self._lock:
+            self._conn.close()
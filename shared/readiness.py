@@ -0,0 +1,167 @@
+import asyncio
+import time
+import weakref
+from typing import Awaitable, Callable
+
+from dendrite import AsyncPage
+from dendrite.exceptions import PageConditionNotMet
+from playwright.async_api import Page, Request
+
+# A readiness check gets the tab and the seconds left before the deadline, and
+# returns whether the page is ready by its measure
+ReadinessCheck = Callable[[AsyncPage, float], Awaitable[bool]]
+
+# Records the time of the last DOM mutation on the page, installed on first check.
+# Returns the milliseconds since then, or since the observer was installed.
+DOM_QUIET_SCRIPT = """
+() => {
+    if (window.__lastDomMutation === undefined) {
+        window.__lastDomMutation = performance.now();
+        new MutationObserver(() => {
+            window.__lastDomMutation = performance.now();
+        }).observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    }
+    return performance.now() - window.__lastDomMutation;
+}
+"""
+
+
+class _NetworkTracker:
+    # Counts the requests a page has in flight, from the moment it's installed
+    def __init__(self, page: Page):
+        self.in_flight: set[Request] = set()
+        self.last_activity = time.monotonic()
+        page.on("request", self._started)
+        page.on("requestfinished", self._ended)
+        page.on("requestfailed", self._ended)
+
+    def _started(self, request: Request):
+        self.in_flight.add(request)
+        self.last_activity = time.monotonic()
+
+    def _ended(self, request: Request):
+        self.in_flight.discard(request)
+        self.last_activity = time.monotonic()
+
+    def quiet_for(self) -> float:
+        """Seconds since the last request started or ended, 0 while any is in flight."""
+        if self.in_flight:
+            return 0.0
+        return time.monotonic() - self.last_activity
+
+
+# One tracker per page, kept for as long as the page is, so a pooled tab that's
+# navigated again is already tracked from the start of the navigation
+_trackers: "weakref.WeakKeyDictionary[Page, _NetworkTracker]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def network_idle(quiet_time: float = 0.5) -> ReadinessCheck:
+    """
+    Ready when no request is in flight and none has started or ended for
+    `quiet_time` seconds.
+
+    The requests are followed through the page's request events rather than
+    Playwright's `networkidle` load state, which is only reached once per document
+    load. After a client side navigation, or on a reused tab, the load state has
+    passed already while the new page's requests are still running.
+    """
+
+    async def check(tab: AsyncPage, remaining: float) -> bool:
+        page = tab.playwright_page
+        tracker = _trackers.get(page)
+        if tracker is None:
+            # Requests that started before the first check aren't seen, waiting a
+            # full quiet window from here gives them the time to end
+            tracker = _trackers[page] = _NetworkTracker(page)
+        return tracker.quiet_for() >= quiet_time
+
+    return check
+
+
+def dom_quiet(quiet_time: float = 0.5) -> ReadinessCheck:
+    """Ready when nothing in the DOM has changed for `quiet_time` seconds."""
+
+    async def check(tab: AsyncPage, remaining: float) -> bool:
+        quiet_for = await tab.playwright_page.evaluate(DOM_QUIET_SCRIPT)
+        return quiet_for >= quiet_time * 1000
+
+    return check
+
+
+def selector_count_stable(
+    selector: str, min_count: int = 1, stable_polls: int = 2
+) -> ReadinessCheck:
+    """
+    Ready when at least `min_count` elements match `selector` and the count hasn't
+    changed for `stable_polls` polls in a row, e.g. once a list stops growing.
+    """
+    counts: list[int] = []
+
+    async def check(tab: AsyncPage, remaining: float) -> bool:
+        counts.append(await tab.playwright_page.locator(selector).count())
+        last = counts[-(stable_polls + 1) :]
+        return (
+            len(last) == stable_polls + 1
+            and last[-1] >= min_count
+            and len(set(last)) == 1
+        )
+
+    return check
+
+
+def described(prompt: str) -> ReadinessCheck:
+    """
+    Ready when the page matches a natural language description, via `tab.wait_for`.
+
+    This asks the LLM, so put it after the cheap checks. By the time they pass the
+    page has usually settled and a single ask is enough.
+    """
+
+    async def check(tab: AsyncPage, remaining: float) -> bool:
+        try:
+            await tab.wait_for(prompt, timeout=remaining * 1000)
+            return True
+        except PageConditionNotMet:
+            return False
+
+    return check
+
+
+async def wait_until_ready(
+    tab: AsyncPage,
+    *checks: ReadinessCheck,
+    timeout: float = 15.0,
+    initial_delay: float = 0.1,
+    max_delay: float = 2.0,
+) -> bool:
+    """
+    Polls `checks` in order, with exponential backoff between polls, until they all
+    pass or `timeout` seconds have gone by. A passing check isn't polled again.
+
+    Returns whether the page became ready. Callers usually carry on either way, as
+    they would after a fixed sleep, but only wait as long as the page needs.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    pending = list(checks)
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"{tab.url} not ready after {timeout}s, proceeding anyways")
+            return False
+        try:
+            ready = await pending[0](tab, remaining)
+        except Exception as e:
+            print(f"Readiness check failed, retrying: {e}")
+            ready = False
+        if ready:
+            pending.pop(0)
+            delay = initial_delay
+            continue
+
+        await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, max_delay)
+
+    return True
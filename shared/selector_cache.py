@@ -0,0 +1,220 @@
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+from dendrite import AsyncElement, AsyncPage
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import Locator
+
+CACHE_FILE = Path("cache") / "selectors.sqlite3"
+# Milliseconds a cached selector gets to act before it counts as stale
+CACHED_ACTION_TIMEOUT = 5_000
+
+# Builds a CSS selector that matches only `el`, preferring stable attributes over
+# positions. Ids with digits in them tend to be generated and change between loads.
+CSS_PATH_SCRIPT = """
+(el) => {
+  const isUnique = (selector) => {
+    try {
+      return document.querySelectorAll(selector).length === 1;
+    } catch (e) {
+      return false;
+    }
+  };
+  const parts = [];
+  for (let node = el; node && node !== document.documentElement; node = node.parentElement) {
+    const tag = node.tagName.toLowerCase();
+    const candidates = [];
+    if (node.id && !/\\d/.test(node.id)) candidates.push(`#${CSS.escape(node.id)}`);
+    for (const attr of ["data-testid", "aria-label", "name", "placeholder", "title"]) {
+      const value = node.getAttribute(attr);
+      if (value) candidates.push(`${tag}[${attr}="${CSS.escape(value)}"]`);
+    }
+    for (const candidate of candidates) {
+      const selector = [candidate, ...parts].join(" > ");
+      if (isUnique(selector)) return selector;
+    }
+    let index = 1;
+    for (let sibling = node.previousElementSibling; sibling; sibling = sibling.previousElementSibling) {
+      if (sibling.tagName === node.tagName) index++;
+    }
+    parts.unshift(`${tag}:nth-of-type(${index})`);
+  }
+  return ["html", ...parts].join(" > ");
+}
+"""
+
+
+def page_fingerprint(url: str) -> tuple[str, str]:
+    """
+    The host and the shape of the path, with segments that contain digits replaced
+    by `*`, so /mail/0/inbox and /mail/1/inbox share their selectors.
+    """
+    parts = urlsplit(url)
+    segments = [
+        "*" if re.search(r"\d", segment) else segment
+        for segment in parts.path.strip("/").split("/")
+    ]
+    return (parts.hostname or "").lower(), "/" + "/".join(segments)
+
+
+class SelectorCache:
+    """
+    Maps a page fingerprint and an element prompt to the CSS selector the element
+    was found with, stored in a local SQLite file.
+
+    Entries are used straight from memory once `warmup()` has loaded them, and
+    from disk otherwise. A selector that no longer matches exactly one element,
+    or fails when used, is dropped so the element gets looked up again.
+    """
+
+    def __init__(self, path: Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS selectors ("
+            "host TEXT NOT NULL, path TEXT NOT NULL, prompt TEXT NOT NULL, "
+            "selector TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (host, path, prompt))"
+        )
+        self._memory: dict[tuple[str, str, str], str] = {}
+        self._warm_hosts: set[str] = set()
+
+    def warmup(self, hosts: Iterable[str]) -> int:
+        """Loads every selector for `hosts` into memory, returns how many."""
+        hosts = [host.lower() for host in hosts]
+        if not hosts:
+            return 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT host, path, prompt, selector FROM selectors "
+                f"WHERE host IN ({', '.join('?' * len(hosts))})",
+                hosts,
+            ).fetchall()
+            for host, path, prompt, selector in rows:
+                self._memory[(host, path, prompt)] = selector
+            self._warm_hosts.update(hosts)
+        return len(rows)
+
+    def get(self, url: str, prompt: str) -> Optional[str]:
+        host, path = page_fingerprint(url)
+        key = (host, path, prompt)
+        with self._lock:
+            if host in self._warm_hosts:
+                selector = self._memory.get(key)
+            else:
+                row = self._conn.execute(
+                    "SELECT selector FROM selectors "
+                    "WHERE host = ? AND path = ? AND prompt = ?",
+                    key,
+                ).fetchone()
+                selector = row[0] if row else None
+            if selector is not None:
+                self._conn.execute(
+                    "UPDATE selectors SET hits = hits + 1, last_used = ? "
+                    "WHERE host = ? AND path = ? AND prompt = ?",
+                    (time.time(), *key),
+                )
+        return selector
+
+    def put(self, url: str, prompt: str, selector: str):
+        host, path = page_fingerprint(url)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO selectors "
+                "(host, path, prompt, selector, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (host, path, prompt, selector, now, now),
+            )
+            self._memory[(host, path, prompt)] = selector
+
+    def invalidate(self, url: str, prompt: str):
+        host, path = page_fingerprint(url)
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM selectors WHERE host = ? AND path = ? AND prompt = ?",
+                (host, path, prompt),
+            )
+            self._memory.pop((host, path, prompt), None)
+
+
+@lru_cache(maxsize=None)
+def get_selector_cache() -> SelectorCache:
+    return SelectorCache(CACHE_FILE)
+
+
+def _cached_element(tab: AsyncPage, selector: str, locator: Locator) -> AsyncElement:
+    # Wrapped like the elements Dendrite returns itself, so a cached element gets
+    # the same fallbacks when it's clicked or filled, e.g. a forced click or
+    # filling a fillable child
+    return AsyncElement(
+        selector, locator, tab.dendrite_browser, tab._get_browser_api_client()
+    )
+
+
+async def _resolve(tab: AsyncPage, prompt: str) -> tuple[AsyncElement, bool]:
+    # The cached selector if it still matches exactly one element, otherwise ask
+    # Dendrite for the element and remember how to find it
+    cache = get_selector_cache()
+    selector = cache.get(tab.url, prompt)
+    if selector is not None:
+        locator = tab.playwright_page.locator(selector)
+        if await locator.count() == 1:
+            return _cached_element(tab, selector, locator), True
+        print(f"Cached selector for '{prompt}' is stale, looking it up again")
+        cache.invalidate(tab.url, prompt)
+
+    element = await tab.get_element(prompt)
+    if element is None:
+        raise ValueError(f"Could not find '{prompt}' on {tab.url}")
+    try:
+        cache.put(tab.url, prompt, await element.locator.evaluate(CSS_PATH_SCRIPT))
+    except PlaywrightError as e:
+        print(f"Could not build a selector for '{prompt}': {e}")
+    return element, False
+
+
+async def click(tab: AsyncPage, prompt: str):
+    """Like `tab.click(prompt)`, skipping the element lookup when it's cached."""
+    element, cached = await _resolve(tab, prompt)
+    if not cached:
+        await element.click()
+        return
+    try:
+        await element.click(timeout=CACHED_ACTION_TIMEOUT)
+    except Exception as e:
+        print(f"Cached selector for '{prompt}' failed, looking it up again: {e}")
+        get_selector_cache().invalidate(tab.url, prompt)
+        element, _ = await _resolve(tab, prompt)
+        await element.click()
+
+
+async def fill(tab: AsyncPage, prompt: str, value: str):
+    """Like `tab.fill(prompt, value)`, skipping the element lookup when it's cached."""
+    element, cached = await _resolve(tab, prompt)
+    if not cached:
+        await element.fill(value)
+        return
+    try:
+        await element.fill(value, timeout=CACHED_ACTION_TIMEOUT)
+    except Exception as e:
+        print(f"Cached selector for '{prompt}' failed, looking it up again: {e}")
+        get_selector_cache().invalidate(tab.url, prompt)
+        element, _ = await _resolve(tab, prompt)
+        await element.fill(value)
+
+
+async def fill_fields(tab: AsyncPage, fields: dict[str, str]):
+    for prompt, value in fields.items():
+        await fill(tab, prompt, value)
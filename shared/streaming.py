@@ -0,0 +1,201 @@
+import asyncio
+import csv
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Protocol,
+    TypeVar,
+    Union,
+)
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def stream_completed(
+    items: Iterable[T],
+    fn: Callable[[T], Awaitable[R]],
+    max_pending: int,
+    return_exceptions: bool = False,
+) -> AsyncIterator[tuple[T, Union[R, BaseException]]]:
+    """
+    Runs `fn` on each item and yields `(item, result)` pairs as they complete.
+
+    Unlike `asyncio.gather`, tasks are created lazily from `items` and at most
+    `max_pending` exist at once, so memory stays flat however many items there
+    are as long as the consumer doesn't hold on to the results. A failing task
+    raises here and cancels the rest, unless `return_exceptions` is set, in which
+    case the exception is yielded as the result.
+    """
+    iterator = iter(items)
+    pending: dict[asyncio.Future, T] = {}
+
+    def fill():
+        for item in iterator:
+            pending[asyncio.ensure_future(fn(item))] = item
+            if len(pending) >= max_pending:
+                return
+
+    fill()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item = pending.pop(task)
+                error = task.exception()
+                if error is not None and not return_exceptions:
+                    raise error
+                yield item, error if error is not None else task.result()
+            fill()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _to_dict(record: Union[BaseModel, dict]) -> dict:
+    return record.model_dump(mode="json") if isinstance(record, BaseModel) else record
+
+
+class Sink(Protocol):
+    def write(self, record: Union[BaseModel, dict]): ...
+
+    def close(self): ...
+
+
+class _SinkContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        pass
+
+
+class NDJSONSink(_SinkContext):
+    """Writes one JSON object per line, flushed as each record comes in."""
+
+    def __init__(self, path: Path, append: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if append else "w")
+
+    def write(self, record: Union[BaseModel, dict]):
+        self._file.write(json.dumps(_to_dict(record)) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CSVSink(_SinkContext):
+    """
+    Writes one row per record with the columns of the first record, or of the
+    existing header when appending. Nested values are stored as JSON.
+    """
+
+    def __init__(self, path: Path, append: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fieldnames = None
+        if append and self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, newline="") as f:
+                fieldnames = next(csv.reader(f), None)
+        self._file = open(self.path, "a" if append else "w", newline="")
+        self._writer = (
+            csv.DictWriter(self._file, fieldnames, extrasaction="ignore")
+            if fieldnames
+            else None
+        )
+
+    def write(self, record: Union[BaseModel, dict]):
+        row = {
+            key: json.dumps(value) if isinstance(value, (dict, list)) else value
+            for key, value in _to_dict(record).items()
+        }
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, list(row), extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class SQLiteSink(_SinkContext):
+    """Stores each record as a JSON row, each insert is its own transaction."""
+
+    def __init__(self, path: Path, table: str = "records", append: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        self.table = table
+        # Autocommit mode: each statement is its own atomic transaction
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "id INTEGER PRIMARY KEY, data TEXT NOT NULL, written_at REAL NOT NULL)"
+        )
+        if not append:
+            self._conn.execute(f"DELETE FROM {table}")
+
+    def write(self, record: Union[BaseModel, dict]):
+        self._conn.execute(
+            f"INSERT INTO {self.table} (data, written_at) VALUES (?, ?)",
+            (json.dumps(_to_dict(record)), time.time()),
+        )
+
+    def close(self):
+        self._conn.close()
+
+
+class FanOutSink(_SinkContext):
+    """Writes every record to each of `sinks`."""
+
+    def __init__(self, sinks: list[Sink]):
+        self.sinks = sinks
+
+    def write(self, record: Union[BaseModel, dict]):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+SINKS_BY_SUFFIX: dict[str, Any] = {
+    ".ndjson": NDJSONSink,
+    ".jsonl": NDJSONSink,
+    ".csv": CSVSink,
+    ".db": SQLiteSink,
+    ".sqlite": SQLiteSink,
+    ".sqlite3": SQLiteSink,
+}
+
+
+def open_sink(*paths: Path, append: bool = False) -> FanOutSink:
+    """Opens a sink per path, picked by file extension, that are written together."""
+    sinks = []
+    for path in paths:
+        sink_class = SINKS_BY_SUFFIX.get(Path(path).suffix)
+        if sink_class is None:
+            raise ValueError(
+                f"Unsupported output {path}, use one of {', '.join(SINKS_BY_SUFFIX)}"
+            )
+        sinks.append(sink_class(path, append=append))
+    return FanOutSink(sinks)
@@ -0,0 +1,99 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from dendrite import AsyncDendrite, AsyncPage
+
+
+class AsyncTabPool:
+    """
+    Keeps up to `size` warm tabs open and hands them out one job at a time.
+
+    Reused tabs are navigated to the next URL instead of being closed and reopened,
+    and are reset to a blank page between jobs. A tab is closed and replaced after
+    `max_uses` jobs, or as soon as a job using it fails. Closing the pool closes
+    every tab it opened, including the ones still borrowed.
+    """
+
+    RESET_URL = "about:blank"
+
+    def __init__(self, browser: AsyncDendrite, size: int = 10, max_uses: int = 25):
+        self.browser = browser
+        self.size = size
+        self.max_uses = max_uses
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[tuple[AsyncPage, int]] = []
+        # Every tab the pool opened and hasn't closed yet, idle or borrowed
+        self._tabs: set[AsyncPage] = set()
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @asynccontextmanager
+    async def tab(self, url: str) -> AsyncIterator[AsyncPage]:
+        """Borrows a tab navigated to `url` and returns it to the pool afterwards."""
+        await self._slots.acquire()
+        try:
+            tab, uses = await self._checkout(url)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        healthy = False
+        try:
+            yield tab
+            healthy = True
+        finally:
+            await self._checkin(tab, uses + 1, healthy)
+            self._slots.release()
+
+    async def _checkout(self, url: str) -> tuple[AsyncPage, int]:
+        while self._idle:
+            tab, uses = self._idle.pop()
+            if tab.playwright_page.is_closed():
+                self._tabs.discard(tab)
+                continue
+            try:
+                await tab.goto(url)
+            except Exception as e:
+                print(f"Exception when loading {url} but continuing anyways: {e}")
+            return tab, uses
+
+        tab = await self.browser.new_tab(url)
+        if self._closed:
+            # Opened while the pool was being closed, there's no job left for it
+            await self._close_tab(tab)
+            raise RuntimeError("The tab pool is closed")
+        self._tabs.add(tab)
+        return tab, 0
+
+    async def _checkin(self, tab: AsyncPage, uses: int, healthy: bool):
+        if self._closed:
+            # The pool closed the tab while it was borrowed
+            return
+        if healthy and uses < self.max_uses and not tab.playwright_page.is_closed():
+            try:
+                # Unload the previous page so nothing from the last job leaks into the next
+                await tab.playwright_page.goto(self.RESET_URL)
+                self._idle.append((tab, uses))
+                return
+            except Exception as e:
+                print(f"Failed to reset tab, recycling it: {e}")
+
+        await self._close_tab(tab)
+
+    async def _close_tab(self, tab: AsyncPage):
+        self._tabs.discard(tab)
+        try:
+            await tab.close()
+        except Exception as e:
+            print(f"Failed to close tab: {e}")
+
+    async def close(self):
+        self._closed = True
+        self._idle = []
+        await asyncio.gather(*[self._close_tab(tab) for tab in list(self._tabs)])
@@ -0,0 +1,474 @@
+import contextvars
+import functools
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from urllib.parse import urlsplit
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf")
+)  # fmt: skip
+
+# Browser methods that get a span, on AsyncDendrite, Dendrite and their pages
+TRACED_METHODS = {
+    "goto",
+    "new_tab",
+    "wait_for",
+    "extract",
+    "ask",
+    "markdown",
+    "click",
+    "fill",
+    "press",
+}
+
+
+def prompt_hash(value: Any) -> str:
+    # Groups calls with the same prompt without putting whole prompts in the trace
+    encoded = value if isinstance(value, str) else json.dumps(value, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:12]
+
+
+def url_host(url: Any) -> Optional[str]:
+    return urlsplit(url).hostname if isinstance(url, str) else None
+
+
+class Histogram:
+    """Counts of observations per latency bucket, constant memory however many."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        # Interpolated within the bucket, like Prometheus' histogram_quantile
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        trace_id: int,
+        span_id: int,
+        parent_id: Optional[int],
+        attributes: dict,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(
+            {key: value for key, value in attributes.items() if value is not None}
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Tracer:
+    """
+    Records nested spans around browser and LLM calls, with a latency histogram
+    and error count per span name and token counts per model.
+
+    The current span is kept in a context variable, so spans started in a task
+    nest under the span that created the task. Finished spans go to the exporters,
+    the histograms are kept for the lifetime of the process.
+    """
+
+    def __init__(self):
+        self._current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+            "current_span", default=None
+        )
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.histograms: dict[str, Histogram] = {}
+        self.errors: dict[str, int] = {}
+        self.tokens: dict[tuple[str, str], int] = {}
+        self.exporters: list = []
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, **attributes) -> Iterator[Span]:
+        """
+        Times the block as a span named `name`, a child of the current span unless
+        `root` is set. Attributes that are None are left out.
+        """
+        parent = None if root else self._current.get()
+        span_id = next(self._ids)
+        span = Span(
+            name,
+            parent.trace_id if parent else span_id,
+            span_id,
+            parent.span_id if parent else None,
+            {},
+        )
+        span.set(**attributes)
+        token = self._current.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            self._current.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            histogram = self.histograms.get(span.name)
+            if histogram is None:
+                histogram = self.histograms[span.name] = Histogram()
+            histogram.observe(span.duration)
+            if span.error is not None:
+                self.errors[span.name] = self.errors.get(span.name, 0) + 1
+            exporters = list(self.exporters)
+        for exporter in exporters:
+            exporter.export(span)
+
+    def count_tokens(self, model: str, kind: str, tokens: Optional[int]):
+        if tokens:
+            with self._lock:
+                self.tokens[(model, kind)] = self.tokens.get((model, kind), 0) + tokens
+
+    def add_exporter(self, exporter):
+        with self._lock:
+            self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter):
+        with self._lock:
+            self.exporters.remove(exporter)
+
+    @contextmanager
+    def recording(self) -> Iterator["SummaryExporter"]:
+        """Collects the spans finished inside the block, for a per-run summary."""
+        summary = SummaryExporter()
+        self.add_exporter(summary)
+        try:
+            yield summary
+        finally:
+            self.remove_exporter(summary)
+
+    def prometheus_text(self) -> str:
+        """The histograms and counters in the Prometheus text exposition format."""
+        lines = [
+            "# HELP span_duration_seconds Latency of browser and LLM calls",
+            "# TYPE span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(
+                        f'span_duration_seconds_bucket{{name="{name}",le="{le}"}} '
+                        f"{cumulative}"
+                    )
+                lines.append(
+                    f'span_duration_seconds_sum{{name="{name}"}} {histogram.sum}'
+                )
+                lines.append(
+                    f'span_duration_seconds_count{{name="{name}"}} {histogram.count}'
+                )
+            lines += [
+                "# HELP span_errors_total Calls that raised",
+                "# TYPE span_errors_total counter",
+            ]
+            for name, errors in sorted(self.errors.items()):
+                lines.append(f'span_errors_total{{name="{name}"}} {errors}')
+            lines += [
+                "# HELP llm_tokens_total Tokens used by LLM requests",
+                "# TYPE llm_tokens_total counter",
+            ]
+            for (model, kind), tokens in sorted(self.tokens.items()):
+                lines.append(
+                    f'llm_tokens_total{{model="{model}",kind="{kind}"}} {tokens}'
+                )
+        return "\n".join(lines) + "\n"
+
+
+# Shared by everything in the process, like the OpenAI client
+TRACER = Tracer()
+
+
+class JSONTraceExporter:
+    """
+    Appends each finished span to a trace file in the Chrome trace event format,
+    which chrome://tracing and https://ui.perfetto.dev open directly. Spans of the
+    same trace share a row, so concurrent pages show up side by side.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # The closing bracket is optional in this format, so the file is valid
+        # however the process ends
+        self._file = open(self.path, "w")
+        self._file.write("[\n")
+        self._pid = os.getpid()
+
+    def export(self, span: Span):
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": span.start * 1e6,
+            "dur": span.duration * 1e6,
+            "pid": self._pid,
+            "tid": span.trace_id,
+            "args": {**span.to_dict()["attributes"], "error": span.error},
+        }
+        with self._lock:
+            self._file.write(json.dumps(event, default=str) + ",\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SummaryExporter:
+    """Latency histograms of the spans it's given, printed as a table."""
+
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = {}
+        self.errors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            histogram = self.histograms.setdefault(span.name, Histogram())
+            histogram.observe(span.duration)
+            if span.error is not None:
+                self.errors[span.name] = self.errors.get(span.name, 0) + 1
+
+    def table(self) -> str:
+        header = (
+            f"{'span':<24}{'calls':>7}{'errors':>8}{'total s':>10}"
+            f"{'mean s':>9}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'max s':>8}"
+        )
+        rows = [header, "-" * len(header)]
+        with self._lock:
+            items = sorted(
+                self.histograms.items(), key=lambda item: item[1].sum, reverse=True
+            )
+            for name, h in items:
+                rows.append(
+                    f"{name:<24}{h.count:>7}{self.errors.get(name, 0):>8}"
+                    f"{h.sum:>10.2f}{h.sum / h.count:>9.3f}{h.quantile(0.5):>8.3f}"
+                    f"{h.quantile(0.95):>8.3f}{h.quantile(0.99):>8.3f}{h.max:>8.3f}"
+                )
+        return "\n".join(rows)
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves the tracer's metrics for Prometheus at /metrics, from a daemon thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = TRACER.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def _call_attributes(target: Any, method: str, args: tuple, kwargs: dict) -> dict:
+    url = kwargs.get("url", args[0] if args and method in ("goto", "new_tab") else None)
+    if url is None:
+        try:
+            url = getattr(target, "url", None)
+        except Exception:
+            url = None
+    prompt = kwargs.get("prompt")
+    if prompt is None and args and method not in ("goto", "new_tab", "press"):
+        prompt = args[0]
+    return {
+        "host": url_host(url),
+        "prompt_hash": prompt_hash(prompt) if isinstance(prompt, str) else None,
+    }
+
+
+class TracedBrowser:
+    """
+    Wraps a Dendrite or AsyncDendrite client, or one of their pages, and records a
+    span for each call to one of TRACED_METHODS. Pages it returns are wrapped too,
+    everything else is passed through untouched.
+    """
+
+    def __init__(self, target: Any):
+        self._target = target
+
+    def __getattr__(self, name: str):
+        value = getattr(self._target, name)
+        if name not in TRACED_METHODS or not callable(value):
+            return value
+
+        span_name = f"browser.{name}"
+        target = self._target
+
+        if inspect.iscoroutinefunction(value):
+
+            @functools.wraps(value)
+            async def traced_async(*args, **kwargs):
+                attributes = _call_attributes(target, name, args, kwargs)
+                with TRACER.span(span_name, **attributes):
+                    return _wrap_page(await value(*args, **kwargs))
+
+            return traced_async
+
+        @functools.wraps(value)
+        def traced(*args, **kwargs):
+            attributes = _call_attributes(target, name, args, kwargs)
+            with TRACER.span(span_name, **attributes):
+                return _wrap_page(value(*args, **kwargs))
+
+        return traced
+
+    async def __aenter__(self):
+        await self._target.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._target.__aexit__(*exc)
+
+    def __enter__(self):
+        self._target.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._target.__exit__(*exc)
+
+
+def _wrap_page(result: Any) -> Any:
+    if hasattr(result, "playwright_page") and not isinstance(result, TracedBrowser):
+        return TracedBrowser(result)
+    return result
+
+
+def traced(browser: Any) -> Any:
+    """`browser` wrapped in a TracedBrowser, unless it already is one."""
+    return browser if isinstance(browser, TracedBrowser) else TracedBrowser(browser)
+
+
+def _record_usage(span: Span, response: Any):
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    model = span.attributes.get("model", "unknown")
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None)
+    span.set(
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        cached_tokens=cached,
+    )
+    TRACER.count_tokens(model, "prompt", usage.prompt_tokens)
+    TRACER.count_tokens(model, "completion", usage.completion_tokens)
+    TRACER.count_tokens(model, "cached", cached)
+
+
+def _traced_completion(method: Any, span_name: str) -> Any:
+    def attributes(kwargs: dict) -> dict:
+        return {
+            "model": kwargs.get("model"),
+            "prompt_hash": prompt_hash(kwargs.get("messages")),
+        }
+
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def traced_async(*args, **kwargs):
+            with TRACER.span(span_name, **attributes(kwargs)) as span:
+                response = await method(*args, **kwargs)
+                _record_usage(span, response)
+                return response
+
+        return traced_async
+
+    @functools.wraps(method)
+    def traced(*args, **kwargs):
+        with TRACER.span(span_name, **attributes(kwargs)) as span:
+            response = method(*args, **kwargs)
+            _record_usage(span, response)
+            return response
+
+    return traced
+
+
+def instrument_openai(client: Any) -> Any:
+    """
+    Records a span with the model, prompt hash and token usage for every chat
+    completion made through `client`, an OpenAI or AsyncOpenAI client.
+    Instruments the client in place and returns it.
+    """
+    if getattr(client, "_traced", False):
+        return client
+    client._traced = True
+    completions = client.chat.completions
+    completions.create = _traced_completion(completions.create, "llm.create")
+    parse = client.beta.chat.completions
+    parse.parse = _traced_completion(parse.parse, "llm.parse")
+    return client